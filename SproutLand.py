@@ -1,5 +1,69 @@
-from code.main import Game
+import os, argparse, random, warnings
+from time import perf_counter
+from code.settings import TICK_RATE, FPS_CAP, SAVE_PATH, STREAM_WORLD
+from code.assets import assets
+from code.controls import DeviceControls, Recorder, ReplayControls
 
 if __name__ == '__main__':
-	game = Game()
-	game.run()
\ No newline at end of file
+	parser = argparse.ArgumentParser(description = 'Sprout Land')
+	parser.add_argument('--no-map-cache', action = 'store_true', help = 'parse data/map.tmx instead of reading its compiled cache')
+	parser.add_argument('--startup-time', action = 'store_true', help = 'print how long startup and asset loading took')
+	parser.add_argument('--tick-rate', type = int, default = TICK_RATE, help = 'simulation ticks per second')
+	parser.add_argument('--fps-cap', type = int, default = FPS_CAP, help = 'maximum frames drawn per second, 0 for uncapped')
+	parser.add_argument('--headless', type = int, metavar = 'TICKS', help = 'run this many simulation ticks without a display and exit')
+	parser.add_argument('--seed', type = int, help = 'seed the random number generator')
+	inputs = parser.add_mutually_exclusive_group()
+	inputs.add_argument('--record', metavar = 'PATH', help = 'record every tick of input to PATH')
+	inputs.add_argument('--replay', metavar = 'PATH', help = 'play back input recorded with --record')
+	parser.add_argument('--save', metavar = 'PATH', default = SAVE_PATH, help = f'load the game from PATH and autosave to it every night (default {SAVE_PATH})')
+	parser.add_argument('--new-game', action = 'store_true', help = 'ignore the existing save; the next night overwrites it')
+	parser.add_argument('--save-times', action = 'store_true', help = 'print how long each autosave took')
+	parser.add_argument('--profile', metavar = 'PATH', help = 'time each stage of every frame and write the trace to PATH (.csv or .json) on exit')
+	parser.add_argument('--stream', action = 'store_true', default = STREAM_WORLD, help = 'load map sprites in chunks around the camera and evict the ones left behind')
+	args = parser.parse_args()
+	if args.seed is not None and not 0 <= args.seed < 2 ** 64:
+		parser.error('--seed must be between 0 and 2**64 - 1')
+	assets.map_cache = not args.no_map_cache
+
+	# headless runs and recordings always start from a fresh map and leave the save alone
+	save_path = None if args.headless is not None or args.record or args.replay else args.save
+
+	# a replay only matches its recording with the same seed and tick rate
+	controls = None
+	if args.replay:
+		try:
+			controls = ReplayControls(args.replay)
+		except (OSError, ValueError) as error:
+			parser.error(str(error))
+		if not controls.complete:
+			warnings.warn(f'{args.replay} is cut short, replaying its first {controls.ticks} ticks')
+		args.seed, args.tick_rate = controls.seed, controls.tick_rate
+	elif args.record and args.seed is None:
+		args.seed = random.randrange(2 ** 32)
+	if args.seed is not None:
+		random.seed(args.seed)
+	if args.record:
+		controls = Recorder(DeviceControls(), args.record, args.seed, args.tick_rate)
+	if args.headless is not None:
+		os.environ['SDL_VIDEODRIVER'] = 'dummy'
+		os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
+	from code.main import Game
+	start = perf_counter()
+	game = Game(args.tick_rate, args.fps_cap, controls, save_path, args.new_game, args.stream)
+	if args.save_times and game.level.autosaver:
+		game.level.autosaver.verbose = True
+	if args.profile:
+		game.level.profiler.record(args.profile)
+	if args.startup_time:
+		preload, level = game.startup_times['preload'], game.startup_times['level']
+		print(f'startup: {(perf_counter() - start) * 1000:.1f} ms, loading screen and preload {preload * 1000:.1f} ms, level {level * 1000:.1f} ms')
+		print(assets.report())
+
+	if args.headless is not None:
+		elapsed = game.run_headless(args.headless)
+		print(f'headless: {args.headless} ticks in {elapsed:.3f} s ({args.headless / elapsed:.0f} ticks/s)')
+		if game.level.world:
+			print(game.level.world.report())
+	else:
+		game.run()
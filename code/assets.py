@@ -0,0 +1,167 @@
+import os, warnings
+from os import walk
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pygame
+from pytmx.util_pygame import load_pygame
+from .settings import *
+from .support import frame_key
+from .mapcache import load_map, pack_atlas
+from .manifest import read_manifest, folder_matches, folder_key
+
+class AssetRegistry:
+    def __init__(self):
+        self.cache = {}
+        self.folders = {}
+        self.load_counts = {}
+        self.load_times = {}
+        self.request_counts = {}
+
+        # read maps from their compiled cache instead of parsing the TMX
+        self.map_cache = True
+        
+        # frame order from the manifest, and images and sounds preload decoded ahead of their first use
+        self.manifest = None
+        self.decoded = {}
+        self.preload_stats = None
+
+    def fetch(self, kind, key, loader):
+        entry = (kind, key)
+        self.request_counts[entry] = self.request_counts.get(entry, 0) + 1
+        if entry not in self.cache:
+            start = perf_counter()
+            self.cache[entry] = loader()
+            self.load_times[entry] = self.load_times.get(entry, 0) + perf_counter() - start
+            self.load_counts[entry] = self.load_counts.get(entry, 0) + 1
+        return self.cache[entry]
+
+    def load_image(self, path):
+        # preloaded images were converted as they came in
+        surf = self.decoded.pop(folder_key(path), None)
+        return surf if surf is not None else pygame.image.load(path).convert_alpha()
+
+    def load_sound(self, path):
+        sound = self.decoded.pop(folder_key(path), None)
+        return sound if sound is not None else pygame.mixer.Sound(path)
+
+    def image(self, path):
+        return self.fetch('image', path, lambda: self.load_image(path))
+
+    def sound(self, path):
+        return self.fetch('sound', path, lambda: self.load_sound(path))
+
+    def font(self, path, size):
+        return self.fetch('font', (path, size), lambda: pygame.font.Font(path, size))
+
+    def map(self, path):
+        return self.fetch('map', path, lambda: load_map(path) if self.map_cache else load_pygame(path))
+
+    def manifest_folders(self):
+        # checked against the disk once; folders that changed since the manifest was written are walked instead
+        if self.manifest is None:
+            self.manifest = read_manifest() or {'folders': {}}
+            folders = self.manifest['folders']
+            stale = [folder for folder, entries in folders.items() if not folder_matches(folder, entries)]
+            for folder in stale:
+                del folders[folder]
+            if stale:
+                warnings.warn(f'{MANIFEST_PATH} is out of date for {", ".join(stale)}, run python -m code.manifest')
+        return self.manifest['folders']
+
+    def folder_files(self, path):
+        # manifest order without listing the folder, numeric order for folders the manifest does not vouch for
+        entries = self.manifest_folders().get(folder_key(path))
+        if entries is not None:
+            return [entry[0] for entry in entries]
+        return sorted(next(walk(path), (None, None, []))[2], key = frame_key)
+
+    def preload(self, paths, sounds = (), progress = None, workers = None):
+        # decode in threads, pygame releases the GIL while it reads images and sounds; converting stays on the main thread
+        files = []
+        for path in paths:
+            if os.path.isfile(path):
+                files.append(folder_key(path))
+                continue
+            # folders in the manifest are known without walking the tree, anything else loads on first use
+            key = folder_key(path)
+            for folder in sorted(self.manifest_folders()):
+                if folder == key or folder.startswith(key + '/'):
+                    files.extend(folder + '/' + image for image in self.folder_files(folder))
+        files = [path for path in files if path not in self.decoded]
+        sounds = [folder_key(path) for path in sounds if folder_key(path) not in self.decoded]
+        total = len(files) + len(sounds)
+        workers = workers or min(8, os.cpu_count() or 1)
+        start = perf_counter()
+        convert_time = 0
+        with ThreadPoolExecutor(workers) as executor:
+            # sounds first, so the long music decode overlaps the images
+            jobs = {executor.submit(pygame.mixer.Sound, path): path for path in sounds}
+            jobs.update({executor.submit(pygame.image.load, path): path for path in files})
+            for done, job in enumerate(as_completed(jobs), 1):
+                loaded = job.result()
+                if isinstance(loaded, pygame.Surface):
+                    convert_start = perf_counter()
+                    loaded = loaded.convert_alpha()
+                    convert_time += perf_counter() - convert_start
+                self.decoded[jobs[job]] = loaded
+                if progress:
+                    progress(done, total)
+        self.preload_stats = (len(files), len(sounds), workers, perf_counter() - start, convert_time)
+
+    def folder(self, path):
+        if path not in self.folders:
+            self.folders[path] = [self.image(path + '/' + image) for image in self.folder_files(path)]
+        return self.folders[path]
+
+    def pack(self, paths):
+        # one atlas for all the images, each frame is a subsurface of it
+        atlas, rects = pack_atlas([self.load_image(path) for path in paths])
+        atlas = atlas.convert_alpha()
+        return [atlas.subsurface(rect) for rect in rects]
+
+    def frames(self, path):
+        return self.fetch('atlas', path, lambda: self.pack([path + '/' + image for image in self.folder_files(path)]))
+
+    def animations(self, path):
+        # every subfolder of path shares one atlas
+        def load():
+            names = sorted(next(walk(path))[1])
+            files = [self.folder_files(path + '/' + name) for name in names]
+            frames = self.pack([path + '/' + name + '/' + image for name, images in zip(names, files) for image in images])
+            animations = {}
+            for name, images in zip(names, files):
+                animations[name], frames = frames[:len(images)], frames[len(images):]
+            return animations
+        return self.fetch('atlas', path, load)
+
+    def folder_dict(self, path):
+        return {image.split('.')[0]: self.image(path + '/' + image) for image in self.folder_files(path)}
+
+    def clear(self):
+        self.cache.clear()
+        self.folders.clear()
+        self.decoded.clear()
+        self.load_counts.clear()
+        self.load_times.clear()
+        self.request_counts.clear()
+
+    def summary(self):
+        kinds = {}
+        for (kind, key), requests in self.request_counts.items():
+            stats = kinds.setdefault(kind, {'files': 0, 'loads': 0, 'requests': 0, 'seconds': 0})
+            stats['files'] += 1
+            stats['loads'] += self.load_counts.get((kind, key), 0)
+            stats['requests'] += requests
+            stats['seconds'] += self.load_times.get((kind, key), 0)
+        return kinds
+
+    def report(self):
+        lines = []
+        if self.preload_stats:
+            images, sounds, workers, seconds, convert_time = self.preload_stats
+            lines.append(f'preload {images:4} images and {sounds} sounds decoded on {workers} threads  {seconds * 1000:8.1f} ms, {convert_time * 1000:.1f} ms of it converting on the main thread')
+        for kind, stats in sorted(self.summary().items()):
+            lines.append(f"{kind:<6} {stats['files']:4} files  {stats['loads']:4} loads  {stats['requests']:5} requests  {stats['seconds'] * 1000:8.1f} ms")
+        return '\n'.join(lines)
+
+assets = AssetRegistry()
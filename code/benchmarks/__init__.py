@@ -0,0 +1,44 @@
+import argparse
+import pygame
+from .common import boot
+from .world import bench_startup, bench_save, bench_stream
+from .render import bench_renderer, bench_hud, bench_atlas, bench_lighting
+from .collision import bench_collision, bench_harvest
+from .weather import bench_rain, bench_sky
+from .soil import bench_soil, bench_grid, bench_tools, bench_growth
+from .play import bench_play, bench_profiler, bench_timers
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'renderer': bench_renderer,
+    'collision': bench_collision,
+    'rain': bench_rain,
+    'soil': bench_soil,
+    'grid': bench_grid,
+    'tools': bench_tools,
+    'play': bench_play,
+    'profiler': bench_profiler,
+    'timers': bench_timers,
+    'hud': bench_hud,
+    'save': bench_save,
+    'growth': bench_growth,
+    'atlas': bench_atlas,
+    'harvest': bench_harvest,
+    'stream': bench_stream,
+    'sky': bench_sky,
+    'lighting': bench_lighting
+}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Sprout Land benchmarks')
+    parser.add_argument('names', nargs = '*', metavar = 'name', help = f'any of {", ".join(BENCHMARKS)} (default: all)')
+    parser.add_argument('--frames', type = int, default = 300)
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark {name!r}')
+
+    boot()
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name](args.frames)
+    pygame.quit()
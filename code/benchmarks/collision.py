@@ -0,0 +1,113 @@
+from time import perf_counter
+from random import Random
+from types import SimpleNamespace
+import pygame
+from ..settings import *
+from .common import report, walk_player
+
+def legacy_collision(player, direction):
+    # Player.collision before the spatial hash, kept as a reference
+    for sprite in player.collision_sprites.sprites():
+        if hasattr(sprite, 'hitbox'):
+            if sprite.hitbox.colliderect(player.hitbox):
+                if direction == 'horizontal':
+                    if player.direction.x > 0:
+                        player.hitbox.right = sprite.hitbox.left
+                    if player.direction.x < 0:
+                        player.hitbox.left = sprite.hitbox.right
+                    player.rect.centerx = player.hitbox.centerx
+                    player.pos.x = player.hitbox.centerx
+
+                if direction == 'vertical':
+                    if player.direction.y > 0:
+                        player.hitbox.bottom = sprite.hitbox.top
+                    if player.direction.y < 0:
+                        player.hitbox.top = sprite.hitbox.bottom
+                    player.rect.centery = player.hitbox.centery - PLAYER_HITBOX_OFFSET['vertical']
+                    player.pos.y = player.hitbox.centery - PLAYER_HITBOX_OFFSET['vertical']
+
+def collision_probes(count, size):
+    # deterministic player states scattered over the barrier field
+    rng = Random(count)
+    probes = []
+    for _ in range(count):
+        x, y = rng.randint(0, size), rng.randint(0, size)
+        direction = pygame.math.Vector2(rng.choice((-1, 0, 1)), rng.choice((-1, 0, 1)))
+        probes.append((x, y, direction))
+    return probes
+
+def resolve(collision, group, probes):
+    results = []
+    samples = []
+    for x, y, direction in probes:
+        player = SimpleNamespace(collision_sprites = group, direction = direction,
+                                 pos = pygame.math.Vector2(x, y),
+                                 rect = pygame.Rect(0, 0, 64, 64),
+                                 hitbox = pygame.Rect(0, 0, 47, 25))
+        player.rect.center = (x, y)
+        player.hitbox.center = (x, y + PLAYER_HITBOX_OFFSET['vertical'])
+        start = perf_counter()
+        collision(player, 'horizontal')
+        collision(player, 'vertical')
+        samples.append((perf_counter() - start) * 1000)
+        results.append((tuple(player.hitbox), tuple(player.rect), tuple(player.pos)))
+    return results, samples
+
+def bench_collision(frames):
+    from ..level import CollisionGroup
+    from ..player import Player
+    from ..sprites import Barrier
+    surf = pygame.Surface((TILE_SIZE, TILE_SIZE))
+    for count in (100, 1000, 10000):
+        rng = Random(0)
+        size = int((count * 4) ** 0.5) * TILE_SIZE
+        group = CollisionGroup()
+        for _ in range(count):
+            Barrier((rng.randrange(0, size, TILE_SIZE), rng.randrange(0, size, TILE_SIZE)), surf, group)
+        group.flush()
+        probes = collision_probes(frames, size)
+        legacy_results, legacy_samples = resolve(legacy_collision, group, probes)
+        results, samples = resolve(Player.collision, group, probes)
+        print(f'collision: {count} barriers, {frames} frames, identical results: {results == legacy_results}')
+        report('  full scan', legacy_samples)
+        report('  spatial hash', samples)
+
+def legacy_plant_collision(level):
+    # Level.plant_collision before the ripe plant index, kept as a reference
+    from ..sprites import Particle
+    from ..grid import PLANTED
+    for plant in level.soil_layer.plant_sprites.sprites():
+        if plant.harvestable and plant.rect.colliderect(level.player.hitbox):
+            level.player_add(plant.plant_type)
+            Particle(plant.rect.topleft, plant.image, level.all_sprites, LAYERS['main'])
+            level.soil_layer.grid.clear(plant.rect.centerx // TILE_SIZE, plant.rect.centery // TILE_SIZE, PLANTED)
+            plant.kill()
+
+def bench_harvest(frames):
+    from ..level import Level
+    from ..grid import FARMABLE, HOED
+    print(f'harvest: {frames} frames walking over a farm covering every ground cell, one in three plants ripe')
+    results = []
+    for collide in (legacy_plant_collision, None):
+        level = Level()
+        collide = collide or type(level).plant_collision
+        soil_layer = level.soil_layer
+        grid = soil_layer.grid
+        grid.cells[:] = bytes([FARMABLE | HOED]) * len(grid.cells)
+        soil_layer.create_soil_tiles()
+        for index, (x, y) in enumerate(grid.find(HOED, HOED)):
+            soil_layer.plant_seed(((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE), 'corn' if index % 2 else 'tomato')
+        for index, plant in enumerate(soil_layer.plant_sprites):
+            if index % 3 == 0:
+                plant.set_age(plant.max_age)
+        samples = []
+        for frame in range(frames):
+            walk_player(level.player, frame)
+            start = perf_counter()
+            collide(level)
+            samples.append((perf_counter() - start) * 1000)
+        plants = len(soil_layer.plant_sprites)
+        report(f'{plants} plants, {"legacy scan" if collide is legacy_plant_collision else "ripe index"}', samples)
+        results.append((dict(level.player.item_inventory), bytes(grid.cells), plants))
+    if results[0] != results[1]:
+        raise AssertionError('the ripe plant index harvested different plants than the full scan')
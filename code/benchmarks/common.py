@@ -0,0 +1,31 @@
+import os
+from math import cos, sin
+import pygame
+from ..settings import *
+from ..support import moved
+
+def boot():
+    # run without a real display or sound card
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+def report(name, samples):
+    mean = sum(samples) / len(samples)
+    print(f'{name:<28} mean {mean:7.3f} ms   p50 {percentile(samples, 50):7.3f} ms   p95 {percentile(samples, 95):7.3f} ms')
+
+def walk_player(player, frame):
+    # circle around the start position so the camera keeps moving
+    x = 1600 + cos(frame / 40) * 700
+    y = 1200 + sin(frame / 40) * 500
+    player.pos.update(x, y)
+    player.rect.center = (round(x), round(y))
+    player.hitbox.centerx = round(x)
+    player.hitbox.centery = round(y) + PLAYER_HITBOX_OFFSET['vertical']
+    moved(player)
@@ -0,0 +1,251 @@
+from time import perf_counter
+from random import Random
+import pygame
+from ..settings import *
+from .common import report, percentile
+
+DIRECTION_KEYS = {'left': pygame.K_LEFT, 'right': pygame.K_RIGHT, 'up': pygame.K_UP, 'down': pygame.K_DOWN}
+
+def standing_points(level, step):
+    # hitbox centres, step pixels apart, where the player stands clear of every collision sprite
+    grid = level.soil_layer.grid
+    hitbox = level.player.hitbox.copy()
+    free = set()
+    for y in range(0, grid.height * TILE_SIZE, step):
+        for x in range(0, grid.width * TILE_SIZE, step):
+            hitbox.center = (x, y)
+            if not any(sprite.hitbox.colliderect(hitbox) for sprite in level.collision_sprites.nearby(hitbox)):
+                free.add((x // step, y // step))
+    return free
+
+def route(free, step, start, goal):
+    # breadth first over the standing points, turned into the corners of the path
+    start = (round(start[0] / step), round(start[1] / step))
+    goal = (round(goal[0] / step), round(goal[1] / step))
+    came_from = {start: None}
+    queue = [start]
+    for point in queue:
+        if point == goal:
+            break
+        x, y = point
+        for neighbour in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if neighbour in free and neighbour not in came_from:
+                came_from[neighbour] = point
+                queue.append(neighbour)
+    if goal not in came_from:
+        return None
+    path = [goal]
+    while came_from[path[-1]]:
+        path.append(came_from[path[-1]])
+    path.reverse()
+    corners = [point for index, point in enumerate(path) if index in (0, len(path) - 1) or
+               (path[index - 1][0] == point[0]) != (point[0] == path[index + 1][0])]
+    return [(x * step, y * step) for x, y in corners]
+
+def walk_to(player, free, step, target, facing):
+    # arrow keys, a tick at a time, until the tool of a player facing this way lands on target;
+    # the last stretch is walked in that direction so the player ends up facing it
+    stand = pygame.math.Vector2(target) - PLAYER_TOOL_OFFSET[facing] + (0, PLAYER_HITBOX_OFFSET['vertical'])
+    approach = stand - pygame.math.Vector2({'left': (-1, 0), 'right': (1, 0), 'up': (0, -1), 'down': (0, 1)}[facing]) * step
+    waypoints = None
+    tolerance = player.speed / TICK_RATE * 0.6
+    ticks = 0
+
+    def keys():
+        nonlocal waypoints, ticks
+        if waypoints is None:
+            path = route(free, step, player.hitbox.center, approach)
+            if path is None:
+                raise AssertionError(f'no path to {tuple(stand)}')
+            waypoints = path + [tuple(approach), tuple(stand)]
+        ticks += 1
+        if ticks > 60 * TICK_RATE:
+            raise AssertionError(f'player stuck on the way to {tuple(stand)}')
+        while waypoints:
+            dx = waypoints[0][0] - player.hitbox.centerx
+            dy = waypoints[0][1] - player.hitbox.centery
+            if abs(dx) > tolerance:
+                return (DIRECTION_KEYS['right' if dx > 0 else 'left'],)
+            if abs(dy) > tolerance:
+                return (DIRECTION_KEYS['down' if dy > 0 else 'up'],)
+            waypoints.pop(0)
+        return None
+    return keys
+
+def switch_to(player, tool):
+    # tap the switch key until the tool comes round
+    def keys():
+        return None if player.selected_tool == tool else (pygame.K_q,)
+    return keys
+
+def hold_until(done, *keys):
+    # hold keys until done() says the work they do is finished
+    def step():
+        return None if done() else keys
+    return step
+
+def play_script(level):
+    # phase name and steps: (ticks, keys) holds keys for that many ticks, a callable is asked
+    # for the keys to hold every tick until it returns None
+    player = level.player
+    step = TILE_SIZE // 4
+    free = standing_points(level, step)
+    row = [((x + 0.5) * TILE_SIZE, 17.5 * TILE_SIZE) for x in range(11, 36)]
+
+    def use_on_cells(key, wait):
+        steps = []
+        for target in row:
+            steps.append(walk_to(player, free, step, target, 'right'))
+            steps.append((1, (key,)))
+            steps.append((wait, ()))
+        return steps
+
+    def plant_cells():
+        # before each cell, cycle to a seed the player still has; cells past the last seed stay bare
+        steps = []
+        seeds = player.seed_inventory
+        for target in row:
+            steps.append(hold_until(lambda: seeds[player.selected_seed] or not any(seeds.values()), pygame.K_e))
+            steps.append(walk_to(player, free, step, target, 'right'))
+            steps.append((1, (pygame.K_LSHIFT,)))
+            steps.append((15, ()))
+        return steps
+
+    # the money from the wood and apples buys corn seeds at the trader
+    menu = level.menu
+    trader = next(sprite for sprite in level.interaction_sprites if sprite.name == 'Trader')
+    def select(index):
+        return hold_until(lambda: menu.index == index, pygame.K_DOWN)
+    corn_seeds = len(player.item_inventory) + list(player.seed_inventory).index('corn')
+    shop = [
+        walk_to(player, free, step, (trader.rect.centerx, trader.rect.bottom), 'up'),
+        (1, (pygame.K_RETURN,)),
+        select(menu.options.index('wood')), hold_until(lambda: player.item_inventory['wood'] == 0, pygame.K_SPACE),
+        select(menu.options.index('apple')), hold_until(lambda: player.item_inventory['apple'] == 0, pygame.K_SPACE),
+        select(corn_seeds), hold_until(lambda: player.money < PURCHASE_PRICES['corn'], pygame.K_SPACE),
+        (1, (pygame.K_ESCAPE,)),
+        (15, ())]
+
+    # trees the player can walk up to from the left
+    chop = [switch_to(player, 'axe')]
+    trees = []
+    for tree in sorted(level.tree_sprites.sprites(), key = lambda tree: tree.rect.topleft):
+        target = (tree.rect.left + 20, tree.rect.bottom - 20)
+        stand = pygame.math.Vector2(target) - PLAYER_TOOL_OFFSET['right'] + (0, PLAYER_HITBOX_OFFSET['vertical'])
+        if route(free, step, player.hitbox.center, stand - (step, 0)) and len(trees) < 3:
+            trees.append(target)
+    for target in trees:
+        chop.append(walk_to(player, free, step, target, 'right'))
+        chop.extend([(1, (pygame.K_SPACE,)), (40, ())] * 6)
+
+    return [
+        ('walk', [(90, (pygame.K_RIGHT,)), (60, (pygame.K_UP,)), (90, (pygame.K_LEFT,)), (60, (pygame.K_DOWN,))]),
+        ('chop trees', chop),
+        ('shop', shop),
+        ('hoe', [switch_to(player, 'hoe')] + use_on_cells(pygame.K_SPACE, 40)),
+        ('water', [switch_to(player, 'water')] + use_on_cells(pygame.K_SPACE, 40)),
+        ('plant', plant_cells()),
+        ('sleep', [walk_to(player, free, step, (1440, 1436), 'left'), (1, (pygame.K_RETURN,)), (300, ())])
+    ]
+
+def bench_play(frames):
+    import random
+    from ..level import Level
+    from ..controls import ScriptedControls
+    from ..grid import HOED, WATERED, PLANTED
+    random.seed(0)
+    controls = ScriptedControls()
+    level = Level(controls = controls)
+    level.raining = level.soil_layer.raining = False
+    seeds = sum(level.player.seed_inventory.values())
+    dt = 1 / TICK_RATE
+
+    print(f'play: scripted session at {TICK_RATE} ticks per second')
+    print(f"{'phase':<12} {'ticks':>5}  {'update p50':>10} {'p95':>7} {'p99':>7}  {'draw p50':>8} {'p95':>7} {'p99':>7}  {'sprites':>7}")
+    for name, steps in play_script(level):
+        update_samples, draw_samples, sprites = [], [], 0
+        for step in steps:
+            if callable(step):
+                ticks = iter(step, None)
+            else:
+                ticks = [step[1]] * step[0]
+            for keys in ticks:
+                controls.hold(*keys)
+                start = perf_counter()
+                level.update(dt)
+                middle = perf_counter()
+                level.draw()
+                end = perf_counter()
+                update_samples.append((middle - start) * 1000)
+                draw_samples.append((end - middle) * 1000)
+                sprites = max(sprites, len(level.all_sprites))
+        controls.release()
+        print(f'{name:<12} {len(update_samples):>5}  '
+              f'{percentile(update_samples, 50):7.3f} ms {percentile(update_samples, 95):7.3f} {percentile(update_samples, 99):7.3f}  '
+              f'{percentile(draw_samples, 50):5.3f} ms {percentile(draw_samples, 95):7.3f} {percentile(draw_samples, 99):7.3f}  {sprites:>7}')
+
+    # the input has to have done the work, not only walked past it
+    grid = level.soil_layer.grid
+    if not all(grid.has(x, 17, HOED) for x in range(11, 36)):
+        raise AssertionError('the scripted session did not hoe the whole row')
+    if sum(tree.health < TREE_HEALTH for tree in level.tree_sprites) < 3:
+        raise AssertionError('the scripted session did not chop three trees')
+    planted = sum(grid.has(x, 17, PLANTED) for x in range(11, 36))
+    # every seed goes in the row, and more of them than the player started with
+    if (planted < 25 and any(level.player.seed_inventory.values())) or planted <= seeds:
+        raise AssertionError(f'the scripted session planted {planted} cells from {seeds} seeds and what it bought')
+
+    # and the night it slept through has to have started a new day
+    watered = grid.find(WATERED, WATERED)
+    if watered != (grid.find(HOED, HOED) if level.raining else []):
+        raise AssertionError(f'{len(watered)} cells still watered after the night')
+    if len(level.soil_layer.plant_sprites) != planted or not all(plant.age > 0 for plant in level.soil_layer.plant_sprites):
+        raise AssertionError('the plants did not grow overnight')
+    # the sleep phase was the last, its ticks are the longest the new day can have lasted
+    if level.sky.elapsed > len(update_samples) * dt:
+        raise AssertionError('the sky did not start a new day')
+
+def bench_profiler(frames):
+    import random
+    from ..level import Level
+    random.seed(0)
+    level = Level()
+    dt = 1 / TICK_RATE
+    print(f'profiler: {frames} frames of update + draw with the profiler off, collecting, and drawing its graph')
+    for name, enabled, visible in (('profiler off', False, False), ('profiler collecting', True, False), ('profiler graph', True, True)):
+        level.profiler.enabled, level.profiler.visible = enabled, visible
+        samples = []
+        for frame in range(frames):
+            start = perf_counter()
+            level.update(dt)
+            level.draw()
+            level.profiler.end_frame()
+            samples.append((perf_counter() - start) * 1000)
+        report(name, samples)
+
+def bench_timers(frames):
+    from ..timer import Scheduler, Timer
+    rng = Random(0)
+    dt = 1 / TICK_RATE
+    print(f'timers: {frames} ticks, six player timers per owner, one in fifty owners busy at a time')
+    for owners in (100, 1000, 10000):
+        scheduler = Scheduler()
+        timers = [Timer(rng.choice((150, 200, 600, 1000)), scheduler = scheduler) for _ in range(owners * 6)]
+        polling, scheduled = [], []
+        for frame in range(frames):
+            for timer in rng.sample(timers, owners // 50):
+                if not timer.active:
+                    timer.activate()
+            scheduler.advance(dt)
+
+            # every timer checks the clock, as each Player and Particle used to
+            start = perf_counter()
+            for timer in timers:
+                timer.active and scheduler.get_ticks() - timer.start_time >= timer.duration
+            polling.append((perf_counter() - start) * 1000)
+
+            start = perf_counter()
+            scheduler.run()
+            scheduled.append((perf_counter() - start) * 1000)
+        report(f'{owners} owners polling', polling)
+        report(f'{owners} owners scheduled', scheduled)
@@ -0,0 +1,151 @@
+from time import perf_counter
+import pygame
+from ..settings import *
+from .common import report, percentile, walk_player
+
+def legacy_custom_draw(group, player):
+    # CameraGroup.custom_draw before the bucketed renderer, kept as a reference
+    group.offset.x = player.rect.centerx - SCREEN_WIDTH / 2
+    group.offset.y = player.rect.centery - SCREEN_HEIGHT / 2
+
+    for layer in LAYERS.values():
+        for sprite in sorted(group.sprites(), key = lambda sprite: sprite.hitbox.bottom if sprite == player else sprite.rect.bottom):
+            if sprite.z == layer:
+                offset_rect = sprite.rect.copy()
+                offset_rect.center -= group.offset
+                group.display_surface.blit(sprite.image, offset_rect)
+
+def time_draw(level, draw, frames):
+    samples = []
+    for frame in range(frames):
+        walk_player(level.player, frame)
+        start = perf_counter()
+        level.display_surface.fill('black')
+        draw(level.all_sprites, level.player)
+        samples.append((perf_counter() - start) * 1000)
+    return samples
+
+def bench_renderer(frames):
+    from ..level import Level, CameraGroup
+    level = Level(bake_static = False)
+    print(f'renderer: {len(level.all_sprites)} sprites, {frames} frames on ./data/map.tmx')
+    report('legacy custom_draw', time_draw(level, legacy_custom_draw, frames))
+    report('indexed custom_draw', time_draw(level, CameraGroup.custom_draw, frames))
+
+    baked = Level(bake_static = True)
+    chunks = sum(len(layer.chunks) for layer in baked.static_layers.values())
+    print(f'renderer: {len(baked.all_sprites)} sprites + {chunks} static chunks with baked layers')
+    report('indexed + baked layers', time_draw(baked, CameraGroup.custom_draw, frames))
+
+def legacy_menu_display(menu):
+    # Menu.display before the cached panel, kept as a reference
+    surface, player = menu.display_surface, menu.player
+    text_surf = menu.font.render(f'${player.money}', False, 'Black')
+    text_rect = text_surf.get_rect(midbottom = (SCREEN_WIDTH / 2, SCREEN_HEIGHT - 40))
+    pygame.draw.rect(surface, 'White', text_rect.copy().inflate(20, 10), 0, 6)
+    surface.blit(text_surf, text_rect)
+    for index, text_surf in enumerate(menu.text_surfs):
+        top = menu.main_rect.top + index * (text_surf.get_height() + (menu.padding * 2) + menu.space)
+        amount = (list(player.item_inventory.values()) + list(player.seed_inventory.values()))[index]
+        bg_rect = pygame.Rect(menu.main_rect.left, top, menu.width, text_surf.get_height() + menu.padding * 2)
+        pygame.draw.rect(surface, 'White', bg_rect, 0, 6)
+        surface.blit(text_surf, text_surf.get_rect(midleft = (menu.main_rect.left + 20, bg_rect.centery)))
+        amount_surf = menu.font.render(f'{amount}', False, 'Black')
+        surface.blit(amount_surf, amount_surf.get_rect(midright = (menu.main_rect.right - 20, bg_rect.centery)))
+        if index == menu.index:
+            pygame.draw.rect(surface, 'Black', bg_rect, 4, 4)
+            label = menu.sell_text if menu.index <= menu.sell_border else menu.buy_text
+            surface.blit(label, label.get_rect(midleft = (menu.main_rect.left + 225, bg_rect.centery)))
+
+def bench_hud(frames):
+    from ..level import Level
+    level = Level()
+    surface, menu = level.display_surface, level.menu
+    print(f'hud: {frames} frames of the open shop panel and money label, selection moving every 10 frames')
+    for name, display in (('legacy shop display', legacy_menu_display), ('cached shop display', type(menu).display)):
+        samples = []
+        for frame in range(frames):
+            menu.index = frame // 10 % len(menu.options)
+            if frame % 30 == 0:
+                level.player.money += 1
+            surface.fill('black')
+            start = perf_counter()
+            display(menu)
+            samples.append((perf_counter() - start) * 1000)
+        report(name, samples)
+
+    # both must draw the same pixels
+    for display in (legacy_menu_display, type(menu).display):
+        surface.fill('black')
+        display(menu)
+        if display is legacy_menu_display:
+            expected = pygame.image.tobytes(surface, 'RGB')
+    if pygame.image.tobytes(surface, 'RGB') != expected:
+        raise AssertionError('cached shop panel differs from the legacy rendering')
+
+def bench_atlas(frames):
+    from ..level import Level
+    from ..support import import_folder
+    from ..assets import assets
+    from ..grid import FARMABLE
+    level = Level()
+    soil_layer = level.soil_layer
+    soil_layer.raining = False
+    print(f'atlas: frames for each planted seed, {frames} seeds')
+
+    # Plant.__init__ used to read its growth frames from disk
+    legacy, shared = [], []
+    kept = []
+    for index in range(frames):
+        start = perf_counter()
+        kept.append(import_folder(f'./graphics/fruit/{"corn" if index % 2 else "tomato"}'))
+        legacy.append((perf_counter() - start) * 1000)
+    surfaces = sum(len(frame_list) for frame_list in kept)
+    pixels = sum(surf.get_width() * surf.get_height() * 4 for frame_list in kept for surf in frame_list)
+    kept.clear()
+    for index in range(frames):
+        start = perf_counter()
+        kept.append(assets.animations('./graphics/fruit')['corn' if index % 2 else 'tomato'])
+        shared.append((perf_counter() - start) * 1000)
+    report('import_folder per plant', legacy)
+    report('shared atlas', shared)
+    print(f'  import_folder kept {surfaces} surfaces, {pixels / 1024:.0f} KiB of pixels')
+    print(f"  the atlas is one {assets.animations('./graphics/fruit')['corn'][0].get_parent().get_size()} surface shared by every plant")
+
+    # planting itself
+    samples = []
+    for x, y in soil_layer.grid.find(FARMABLE, FARMABLE):
+        point = ((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE)
+        soil_layer.get_hit(point)
+        start = perf_counter()
+        soil_layer.plant_seed(point, 'corn')
+        samples.append((perf_counter() - start) * 1000)
+    report(f'plant_seed x {len(samples)}', samples)
+
+def bench_lighting(frames):
+    import random
+    from ..level import Level
+    from ..lighting import Lighting
+    random.seed(0)
+    level = Level()
+    sky = level.sky
+    dt = 1 / TICK_RATE
+    budget = 1000 / TICK_RATE
+    print(f'lighting: {frames} frames of level.draw() at {SCREEN_WIDTH}x{SCREEN_HEIGHT} walking past the houses, {len(level.lighting.lights)} lights, budget {budget:.1f} ms')
+
+    # evening, with the sky still darkening so the light map keeps being rebuilt
+    lights = level.lighting.lights
+    for name, scale, active in (('sky tint only', 1, []), ('light map', 1, lights), ('light map at half size', 2, lights)):
+        level.lighting = Lighting(sky, scale = scale)
+        for light in active:
+            level.lighting.add(light)
+        sky.elapsed = len(sky.table) // 2 * dt
+        samples = []
+        for frame in range(frames):
+            walk_player(level.player, frame)
+            sky.update(dt)
+            start = perf_counter()
+            level.draw()
+            samples.append((perf_counter() - start) * 1000)
+        report(name, samples)
+        print(f'  {level.lighting.composites} light map rebuilds, p95 {"within" if percentile(samples, 95) <= budget else "over"} the frame budget')
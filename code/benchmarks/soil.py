@@ -0,0 +1,158 @@
+import tracemalloc
+from time import perf_counter
+from random import Random
+import pygame
+from ..settings import *
+from .common import report
+
+def bench_soil(frames):
+    from ..level import Level
+    from ..grid import FARMABLE, HOED
+    level = Level()
+    soil_layer = level.soil_layer
+    soil_layer.raining = False
+    farmable = [((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE) for x, y in soil_layer.grid.find(FARMABLE, FARMABLE)]
+    before = len(level.all_sprites)
+    for count in (10, 100, len(farmable)):
+        samples = []
+        for point in farmable[:count]:
+            start = perf_counter()
+            soil_layer.get_hit(point)
+            samples.append((perf_counter() - start) * 1000)
+        hoed = len(soil_layer.grid.find(HOED, HOED))
+        print(f'soil: {hoed} hoed cells, {len(soil_layer.soil_sprites)} soil sprites, {len(level.all_sprites)} camera sprites')
+        report('  get_hit', samples)
+
+        # every pass strikes the cells of the one before again, which must not leave extra sprites behind
+        added = len(level.all_sprites) - before
+        if len(soil_layer.soil_sprites) != hoed or added != hoed:
+            raise AssertionError(f'{len(soil_layer.soil_sprites)} soil sprites and {added} new camera sprites for {hoed} hoed cells')
+
+def legacy_daily_reset(grid):
+    # SoilLayer.remove_water and water_all on the old lists of flags
+    for row in grid:
+        for cell in row:
+            if 'W' in cell:
+                cell.remove('W')
+    for row in grid:
+        for cell in row:
+            if 'X' in cell and not 'W' in cell:
+                cell.append('W')
+
+def bench_grid(frames):
+    from ..grid import SoilGrid, FARMABLE, HOED, WATERED
+    size = 400
+    rng = Random(0)
+    hoed = [(rng.randrange(size), rng.randrange(size)) for _ in range(size * size // 2)]
+
+    tracemalloc.start()
+    legacy = [[['F'] for col in range(size)] for row in range(size)]
+    for x, y in hoed:
+        if 'X' not in legacy[y][x]:
+            legacy[y][x].append('X')
+    legacy_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    grid = SoilGrid(size, size)
+    grid.set_where(0, 0, FARMABLE)
+    for x, y in hoed:
+        grid.set(x, y, HOED)
+    grid_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    legacy_samples, samples, find_samples = [], [], []
+    for _ in range(max(1, frames // 30)):
+        start = perf_counter()
+        legacy_daily_reset(legacy)
+        legacy_samples.append((perf_counter() - start) * 1000)
+        start = perf_counter()
+        grid.clear_all(WATERED)
+        grid.set_where(HOED | WATERED, HOED, WATERED)
+        samples.append((perf_counter() - start) * 1000)
+        start = perf_counter()
+        grid.find(HOED, HOED)
+        find_samples.append((perf_counter() - start) * 1000)
+    print(f'grid: {size}x{size} farm, {len(grid.find(HOED, HOED))} hoed cells')
+    print(f'  lists of flags             {legacy_bytes / 1024 / 1024:7.2f} MiB')
+    print(f'  SoilGrid                   {grid_bytes / 1024 / 1024:7.2f} MiB')
+    report('  daily reset, lists', legacy_samples)
+    report('  daily reset, SoilGrid', samples)
+    report('  list hoed cells, SoilGrid', find_samples)
+
+def bench_tools(frames):
+    from ..level import Level
+    from ..grid import SoilGrid, FARMABLE, HOED
+    from ..soil import PlantColumns
+    level = Level()
+    soil_layer = level.soil_layer
+    soil_layer.raining = False
+
+    # 100x100 farm, every cell hoed; the plant columns index cells of the grid they were made with
+    soil_layer.grid = SoilGrid(100, 100)
+    soil_layer.grid.set_where(0, 0, FARMABLE | HOED)
+    soil_layer.plant_columns = PlantColumns(soil_layer.grid)
+    soil_layer.create_soil_tiles()
+    hit_rects = [pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE) for x, y in soil_layer.grid.find(FARMABLE, FARMABLE)]
+    rng = Random(0)
+    points = [(rng.uniform(0, 100 * TILE_SIZE), rng.uniform(0, 100 * TILE_SIZE)) for _ in range(frames)]
+
+    def time_each(action):
+        samples = []
+        for point in points:
+            start = perf_counter()
+            action(point)
+            samples.append((perf_counter() - start) * 1000)
+        return samples
+
+    def legacy_lookup(point):
+        # the scan get_hit, water and plant_seed used to do
+        for rect in hit_rects:
+            if rect.collidepoint(point):
+                return rect
+
+    print(f'tools: {len(soil_layer.soil_tiles)} hoed tiles, {frames} actions each')
+    report('  linear rect scan', time_each(legacy_lookup))
+    report('  get_hit', time_each(soil_layer.get_hit))
+    report('  water', time_each(soil_layer.water))
+    report('  plant_seed', time_each(lambda point: soil_layer.plant_seed(point, 'corn')))
+
+def legacy_update_plants(soil_layer):
+    # SoilLayer.update_plants before the plant columns, kept as a reference
+    from ..grid import WATERED
+    for plant in soil_layer.plant_sprites.sprites():
+        x, y = plant.rect.center
+        if soil_layer.grid.has(x // TILE_SIZE, y // TILE_SIZE, WATERED):
+            plant.set_age(plant.age + GROW_SPEED[plant.plant_type])
+        if plant.harvestable:
+            soil_layer.collision_sprites.reindex(plant)
+
+def plant_state(soil_layer):
+    return [(plant.age, plant.harvestable, plant.frames.index(plant.image), tuple(plant.rect), plant.z, tuple(getattr(plant, 'hitbox', ()))) for plant in soil_layer.plant_sprites]
+
+def bench_growth(frames):
+    from ..level import Level
+    from ..grid import FARMABLE, HOED, WATERED
+    print('growth: nights of plant growth on every ground cell, half of them watered')
+    layers = []
+    for update in (legacy_update_plants, None):
+        level = Level()
+        update = update or type(level.soil_layer).update_plants
+        soil_layer = level.soil_layer
+        grid = soil_layer.grid
+        grid.cells[:] = bytes([FARMABLE | HOED]) * len(grid.cells)
+        soil_layer.create_soil_tiles()
+        for x, y in grid.find(HOED, HOED):
+            soil_layer.plant_seed(((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE), 'corn' if (x + y) % 2 else 'tomato')
+        samples = []
+        for night in range(6):
+            grid.clear_all(WATERED)
+            for x, y in grid.find(HOED, HOED)[night % 2::2]:
+                grid.set(x, y, WATERED)
+            start = perf_counter()
+            update(soil_layer)
+            samples.append((perf_counter() - start) * 1000)
+        report(f'{len(soil_layer.plant_sprites)} plants, {"legacy grow" if update is legacy_update_plants else "batched grow"}', samples)
+        layers.append(soil_layer)
+    if plant_state(layers[0]) != plant_state(layers[1]):
+        raise AssertionError('batched growth differs from growing each plant')
@@ -0,0 +1,72 @@
+from time import perf_counter
+import pygame
+from ..settings import *
+from .common import report
+
+def bench_rain(frames):
+    from ..level import Level
+    level = Level()
+    for fps in (60, 600):
+        samples = []
+        for frame in range(fps * 2):
+            start = perf_counter()
+            level.rain.update(1 / fps, True)
+            level.rain.floor.draw(level.display_surface, level.all_sprites.offset, level.all_sprites.camera_rect)
+            level.rain.drops.draw(level.display_surface, level.all_sprites.offset, level.all_sprites.camera_rect)
+            samples.append((perf_counter() - start) * 1000)
+        print(f'rain: {fps} fps, {len(level.rain.floor) + len(level.rain.drops)} live particles after 2 s')
+        report('  update + draw per frame', samples)
+
+def legacy_sky_update(colour, end_colour, dt):
+    # Sky.update before the colour table, kept as a reference
+    for index, value in enumerate(end_colour):
+        if colour[index] > value:
+            colour[index] -= 2 * dt
+
+def legacy_tint(surface, full_surf, sky_colour, fade):
+    # Sky.display and Transition.display before the fused pass, kept as a reference
+    full_surf.fill(sky_colour)
+    surface.blit(full_surf, (0, 0), special_flags = pygame.BLEND_RGBA_MULT)
+    if fade < 255:
+        full_surf.fill((fade, fade, fade))
+        surface.blit(full_surf, (0, 0), special_flags = pygame.BLEND_RGB_MULT)
+
+def bench_sky(frames):
+    from ..sky import Sky
+    sky = Sky()
+    surface = pygame.display.get_surface()
+    dt = 1 / TICK_RATE
+
+    # the table gives the colours the per-tick update did
+    colour = sky.start_colour.copy()
+    for tick in range(int(120 / dt)):
+        legacy_sky_update(colour, sky.end_colour, dt)
+        sky.update(dt)
+        if tuple(int(value) for value in colour) != sky.colour:
+            raise AssertionError(f'sky colour table differs from the per-tick update at tick {tick}')
+    print(f'sky: {frames} frames of tint over a {SCREEN_WIDTH}x{SCREEN_HEIGHT} screen, the day colour table has {len(sky.table)} entries')
+
+    scene = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    for x in range(0, SCREEN_WIDTH, 8):
+        pygame.draw.line(scene, (x % 256, (x * 3) % 256, 255 - x % 256), (x, 0), (x, SCREEN_HEIGHT), 8)
+    full_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    cases = (('start of the day', (255, 255, 255), 255), ('evening', sky.table[-1], 255), ('falling asleep', sky.table[-1], 200))
+    for name, colour, fade in cases:
+        sky.colour = colour
+        for label, draw in (('legacy', lambda fade: legacy_tint(surface, full_surf, colour, fade)), ('fused', sky.display)):
+            samples = []
+            for frame in range(frames):
+                surface.blit(scene, (0, 0))
+                start = perf_counter()
+                # the sleep fade steps every tick, like the transition
+                draw(fade if fade == 255 else fade - frame % 60 * 2)
+                samples.append((perf_counter() - start) * 1000)
+            report(f'{name}, {label}', samples)
+            pixels = pygame.image.tobytes(surface, 'RGB')
+            if label == 'legacy':
+                expected = pixels
+
+        # one multiply rounds once where two rounded twice
+        error = max(abs(a - b) for a, b in zip(pixels, expected))
+        if error > (0 if fade == 255 else 2):
+            raise AssertionError(f'{name}: fused tint is {error} levels off the legacy blend')
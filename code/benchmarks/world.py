@@ -0,0 +1,165 @@
+import os, time
+from time import perf_counter
+from ..settings import *
+from .common import report, walk_player
+
+def bench_startup(frames):
+    from ..level import Level
+    from ..assets import assets
+    from ..loading import LoadingScreen
+    assets.clear()
+    start = perf_counter()
+    Level()
+    print(f'startup: cold, Level() built in {(perf_counter() - start) * 1000:.1f} ms')
+    print(assets.report())
+
+    # the game decodes its graphics and sounds on worker threads behind the loading screen
+    assets.clear()
+    start = perf_counter()
+    assets.preload(PRELOAD_ASSETS, PRELOAD_SOUNDS, LoadingScreen().update)
+    middle = perf_counter()
+    Level()
+    print(f'startup: cold, preload {(middle - start) * 1000:.1f} ms + Level() {(perf_counter() - middle) * 1000:.1f} ms')
+    print(assets.report())
+
+    # a second level, as after a new game, reuses everything already loaded
+    start = perf_counter()
+    Level()
+    print(f'startup: warm, Level() built in {(perf_counter() - start) * 1000:.1f} ms')
+
+def bench_save(frames):
+    import tempfile
+    from ..level import Level
+    from ..grid import FARMABLE
+    from .. import savegame
+    level = Level()
+    soil_layer = level.soil_layer
+    soil_layer.raining = False
+
+    # the whole farm hoed, half of it watered, two thirds planted
+    for index, (x, y) in enumerate(soil_layer.grid.find(FARMABLE, FARMABLE)):
+        point = ((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE)
+        soil_layer.get_hit(point)
+        if index % 2:
+            soil_layer.water(point)
+        if index % 3:
+            soil_layer.plant_seed(point, 'corn' if index % 2 else 'tomato')
+    soil_layer.update_plants()
+    # ages that a narrower float would round
+    for plant in soil_layer.plant_sprites:
+        plant.set_age(plant.age + 0.1)
+    saved = savegame.snapshot(level)
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.sav')
+    snapshots, encodes, writes, loads = [], [], [], []
+    for _ in range(max(1, frames // 20)):
+        start = perf_counter()
+        state = savegame.snapshot(level)
+        middle = perf_counter()
+        data = savegame.encode(state)
+        end = perf_counter()
+        savegame.write(path, data)
+        snapshots.append((middle - start) * 1000)
+        encodes.append((end - middle) * 1000)
+        writes.append((perf_counter() - end) * 1000)
+        start = perf_counter()
+        savegame.load(level, path)
+        loads.append((perf_counter() - start) * 1000)
+    print(f'save: {len(soil_layer.soil_sprites)} soil tiles, {len(soil_layer.plant_sprites)} plants, {len(level.tree_sprites)} trees in {len(data)} bytes')
+    report('snapshot', snapshots)
+    report('encode', encodes)
+    report('write', writes)
+    report('load', loads)
+    # compared with the level as it was before it was ever saved, not with a state that went through a save already
+    if savegame.snapshot(level) != saved:
+        raise AssertionError('loading a save did not restore the saved state')
+
+    # saves whose plants and planted cells do not match are refused before anything changes
+    bare = next(cell for cell in soil_layer.grid.find(0, 0))
+    stray = state._replace(plants = state.plants + [(*bare, 'corn', 0)])
+    orphan = state._replace(plants = state.plants[1:])
+    level.player.money += 1
+    before = savegame.snapshot(level)
+    for broken in (stray, orphan):
+        try:
+            savegame.restore(level, savegame.decode(savegame.encode(broken)))
+            raise AssertionError('an inconsistent save was loaded')
+        except ValueError:
+            pass
+    if savegame.snapshot(level) != before:
+        raise AssertionError('refusing a save still changed the level')
+
+    # what the nightly autosave costs the frame that triggers it, a frame apart like the game would
+    level.autosaver = savegame.Autosaver(path)
+    autosaves = []
+    for _ in range(max(1, frames // 20)):
+        level.player.money += 1
+        start = perf_counter()
+        level.autosave()
+        autosaves.append((perf_counter() - start) * 1000)
+        time.sleep(1 / TICK_RATE)
+    report('autosave on the main thread', autosaves)
+    print(level.autosaver.report())
+
+    # a save that cannot be encoded is reported, and the worker still writes the next one
+    saves = len(level.autosaver.timings)
+    level.autosaver.save(state._replace(plants = [(0, 0, 'pumpkin', 0)]), 0)
+    time.sleep(0.1)
+    level.autosaver.save(state, 0)
+    level.autosaver.close()
+    if level.autosaver.error or len(level.autosaver.timings) == saves:
+        raise AssertionError('the autosave worker stopped after a failed save')
+
+def stream_state(level):
+    from .. import savegame
+    state = savegame.snapshot(level)
+    return sorted(state.plants), state.trees, state.cells
+
+def bench_stream(frames):
+    import random
+    from ..level import Level
+    from ..grid import FARMABLE, HOED, WATERED
+    from .. import savegame
+    random.seed(0)
+    print(f'stream: {frames} frames walking the camera around the map, {WORLD_CHUNK_SIZE} px chunks, at most {MAX_RESIDENT_CHUNKS} resident')
+
+    # the same farm over every ground cell in a whole level and a streamed one
+    whole = Level()
+    grid = whole.soil_layer.grid
+    cells = bytes(FARMABLE | HOED | (WATERED if index % 2 else 0) for index in range(len(grid.cells)))
+    plants = [(index % grid.width, index // grid.width, 'corn' if index % 3 else 'tomato', 0) for index in range(len(grid.cells))]
+    whole.soil_layer.restore(cells, plants)
+    streamed = Level(stream = True)
+    savegame.restore(streamed, savegame.snapshot(whole))
+    if stream_state(streamed) != stream_state(whole):
+        raise AssertionError('the streamed world did not take the saved state')
+
+    # nights grow evicted plants the same as loaded ones
+    for _ in range(3):
+        for level in (whole, streamed):
+            level.soil_layer.update_plants()
+        streamed.world.new_day()
+    if stream_state(streamed)[0] != stream_state(whole)[0]:
+        raise AssertionError('plants in evicted chunks grew differently')
+    before = stream_state(streamed)
+
+    samples, draws, sprites = [], [], 0
+    world = streamed.world
+    for frame in range(frames):
+        walk_player(streamed.player, frame * 4)
+        start = perf_counter()
+        world.update(streamed.player.rect.center)
+        middle = perf_counter()
+        streamed.draw()
+        samples.append((middle - start) * 1000)
+        draws.append((perf_counter() - middle) * 1000)
+        sprites = max(sprites, len(streamed.all_sprites) + len(streamed.collision_sprites))
+    # trees not seen since the nights grow fresh apples when they load, everything else comes back as it was
+    after = stream_state(streamed)
+    trees = all(tree[:2] == other[:2] and (tree[2] is None or tree == other) for tree, other in zip(before[1], after[1]))
+    if after[0] != before[0] or after[2] != before[2] or not trees:
+        raise AssertionError('evicting and reloading chunks changed the world')
+    print(f'{len(whole.all_sprites) + len(whole.collision_sprites)} group entries with the whole map loaded, at most {sprites} streamed')
+    report('stream update', samples)
+    report('draw', draws)
+    print(world.report())
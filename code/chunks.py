@@ -0,0 +1,40 @@
+import pygame
+from .settings import *
+
+class ChunkedLayer:
+    def __init__(self, z, chunk_size = STATIC_CHUNK_SIZE):
+        self.z = z
+        self.chunk_size = chunk_size
+        self.chunks = {}
+        self.tiles = []
+        
+    def add(self, pos, surf):
+        self.tiles.append((surf.get_rect(topleft = pos), surf))
+        
+    def bake(self):
+        # composite in the same order the camera would have drawn the sprites
+        size = self.chunk_size
+        for rect, surf in sorted(self.tiles, key = lambda tile: tile[0].bottom):
+            for row in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                for col in range(rect.left // size, (rect.right - 1) // size + 1):
+                    if (col, row) not in self.chunks:
+                        self.chunks[(col, row)] = pygame.Surface((size, size), pygame.SRCALPHA)
+                    self.chunks[(col, row)].blit(surf, (rect.x - col * size, rect.y - row * size))
+        self.tiles.clear()
+        
+        # fully opaque chunks skip per-pixel alpha when drawn
+        for key, chunk in self.chunks.items():
+            if pygame.mask.from_surface(chunk, 254).count() == size * size:
+                self.chunks[key] = chunk.convert()
+            else:
+                self.chunks[key] = chunk.convert_alpha()
+        
+    def draw(self, surface, offset, camera_rect):
+        size = self.chunk_size
+        blits = []
+        for row in range(camera_rect.top // size, (camera_rect.bottom - 1) // size + 1):
+            for col in range(camera_rect.left // size, (camera_rect.right - 1) // size + 1):
+                chunk = self.chunks.get((col, row))
+                if chunk:
+                    blits.append((chunk, (round(col * size - offset.x), round(row * size - offset.y))))
+        surface.blits(blits, False)
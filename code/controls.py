@@ -0,0 +1,194 @@
+import struct, zlib
+from collections import namedtuple
+import pygame
+
+# everything the game reads from the player in one simulation tick
+Actions = namedtuple('Actions', ['move_x', 'move_y', 'use_tool', 'use_seed', 'switch_tool', 'switch_seed', 'interact', 'back', 'scroll'],
+                     defaults = [0, 0, False, False, 0, False, False, False, 0])
+IDLE = Actions()
+
+def read_actions(keys, mouse, wheel):
+    return Actions(
+        move_x = -1 if keys[pygame.K_LEFT] or keys[pygame.K_a] else 1 if keys[pygame.K_RIGHT] or keys[pygame.K_d] else 0,
+        move_y = -1 if keys[pygame.K_UP] or keys[pygame.K_w] else 1 if keys[pygame.K_DOWN] or keys[pygame.K_s] else 0,
+        use_tool = bool(keys[pygame.K_SPACE] or mouse[0]),
+        use_seed = bool(keys[pygame.K_LSHIFT] or mouse[2]),
+        switch_tool = 1 if keys[pygame.K_q] or wheel < 0 else -1 if wheel > 0 else 0,
+        switch_seed = bool(keys[pygame.K_e]),
+        interact = bool(keys[pygame.K_RETURN] or mouse[2]),
+        back = bool(keys[pygame.K_ESCAPE] or mouse[2]),
+        scroll = wheel)
+
+class DeviceControls:
+    def __init__(self):
+        self.actions = IDLE
+        self.wheel = 0
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEWHEEL:
+            self.wheel = event.y
+
+    def update(self):
+        keys, mouse = pygame.key.get_pressed(), pygame.mouse.get_pressed()
+        self.actions = read_actions(keys, mouse, self.wheel)
+        self.wheel = 0
+
+        # cursor only shows after escape, until the next click
+        if mouse[0] or mouse[2]:
+            pygame.mouse.set_visible(False)
+        if keys[pygame.K_ESCAPE]:
+            pygame.mouse.set_visible(True)
+
+    def close(self):
+        pass
+
+class KeyState:
+    def __init__(self, pressed):
+        self.pressed = pressed
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+class ScriptedControls:
+    def __init__(self):
+        self.actions = IDLE
+        self.keys = set()
+
+    def handle_event(self, event):
+        pass
+
+    def hold(self, *keys):
+        self.keys = set(keys)
+
+    def release(self):
+        self.keys = set()
+
+    def update(self):
+        self.actions = read_actions(KeyState(self.keys), (False, False, False), 0)
+
+    def close(self):
+        pass
+
+# recordings: header, then blocks of zlib compressed runs of identical ticks, each behind its length,
+# written as the game runs so a crash or a truncated file only loses the last block
+MAGIC = b'SLIN'
+VERSION = 2
+HEADER = struct.Struct('<4sHHQ')
+BLOCK = struct.Struct('<I')
+RUN = struct.Struct('<HHb')
+FLUSH_TICKS = 600
+
+def pack_actions(actions):
+    bits = ((actions.move_x + 1) | (actions.move_y + 1) << 2 | actions.use_tool << 4 | actions.use_seed << 5 |
+            actions.switch_seed << 6 | actions.interact << 7 | actions.back << 8 | (actions.switch_tool + 1) << 9)
+    return bits, max(-128, min(127, actions.scroll))
+
+def unpack_actions(bits, scroll):
+    return Actions(
+        move_x = (bits & 3) - 1,
+        move_y = (bits >> 2 & 3) - 1,
+        use_tool = bool(bits >> 4 & 1),
+        use_seed = bool(bits >> 5 & 1),
+        switch_seed = bool(bits >> 6 & 1),
+        interact = bool(bits >> 7 & 1),
+        back = bool(bits >> 8 & 1),
+        switch_tool = (bits >> 9 & 3) - 1,
+        scroll = scroll)
+
+class Recorder:
+    def __init__(self, controls, path, seed, tick_rate):
+        self.controls = controls
+        self.path = path
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.runs = []
+        self.ticks = 0
+        self.actions = IDLE
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, tick_rate, seed))
+        self.file.flush()
+
+    def handle_event(self, event):
+        self.controls.handle_event(event)
+
+    def update(self):
+        self.controls.update()
+        self.actions = self.controls.actions
+        packed = pack_actions(self.actions)
+        if self.runs and self.runs[-1][1] == packed and self.runs[-1][0] < 0xFFFF:
+            self.runs[-1][0] += 1
+        else:
+            self.runs.append([1, packed])
+
+        # every block ends on the tick it was written, so a crash loses at most FLUSH_TICKS ticks
+        # even while one input is held, and a run cut here simply carries on in the next block
+        self.ticks += 1
+        if self.ticks >= FLUSH_TICKS:
+            self.save(self.runs)
+            self.runs = []
+            self.ticks = 0
+
+    def save(self, runs):
+        block = zlib.compress(b''.join(RUN.pack(count, bits, scroll) for count, (bits, scroll) in runs))
+        self.file.write(BLOCK.pack(len(block)) + block)
+        self.file.flush()
+
+    def close(self):
+        if self.runs:
+            self.save(self.runs)
+            self.runs = []
+        self.file.close()
+        self.controls.close()
+
+class ReplayControls:
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f'{path} is not a Sprout Land input recording')
+            magic, version, self.tick_rate, self.seed = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{path} is not a Sprout Land input recording')
+            data = file.read()
+
+        # a recording cut short ends at its last whole block
+        self.runs = []
+        position = 0
+        while position + BLOCK.size <= len(data):
+            length, = BLOCK.unpack_from(data, position)
+            block = data[position + BLOCK.size:position + BLOCK.size + length]
+            if len(block) < length:
+                break
+            try:
+                payload = zlib.decompress(block)
+            except zlib.error:
+                break
+            self.runs.extend((count, unpack_actions(bits, scroll)) for count, bits, scroll in RUN.iter_unpack(payload))
+            position += BLOCK.size + length
+        self.complete = position == len(data)
+        self.ticks = sum(count for count, _ in self.runs)
+        self.run_index = 0
+        self.remaining = self.runs[0][0] if self.runs else 0
+        self.actions = IDLE
+
+    def handle_event(self, event):
+        pass
+
+    def update(self):
+        # idle once the recording runs out
+        if self.run_index >= len(self.runs):
+            self.actions = IDLE
+            return
+        self.actions = self.runs[self.run_index][1]
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.run_index += 1
+            if self.run_index < len(self.runs):
+                self.remaining = self.runs[self.run_index][0]
+
+    @property
+    def finished(self):
+        return self.run_index >= len(self.runs)
+
+    def close(self):
+        pass
@@ -0,0 +1,136 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# one bit per soil state
+FARMABLE = 1
+HOED = 2
+WATERED = 4
+PLANTED = 8
+FLAGS = {'F': FARMABLE, 'X': HOED, 'W': WATERED, 'P': PLANTED}
+
+class GridCell:
+    # list-like view of one cell, for code written against the old lists of flags
+    def __init__(self, grid, x, y):
+        self.grid = grid
+        self.x = x
+        self.y = y
+
+    def __contains__(self, letter):
+        return self.grid.has(self.x, self.y, FLAGS[letter])
+
+    def __iter__(self):
+        flags = self.grid.get(self.x, self.y)
+        return iter([letter for letter, flag in FLAGS.items() if flags & flag])
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def append(self, letter):
+        self.grid.set(self.x, self.y, FLAGS[letter])
+
+    def remove(self, letter):
+        if letter not in self:
+            raise ValueError(f'{letter!r} not in cell')
+        self.grid.clear(self.x, self.y, FLAGS[letter])
+
+class GridRow:
+    def __init__(self, grid, y):
+        self.grid = grid
+        self.y = y
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.grid.width:
+            raise IndexError(x)
+        return GridCell(self.grid, x, self.y)
+
+    def __len__(self):
+        return self.grid.width
+
+    def __iter__(self):
+        return (GridCell(self.grid, x, self.y) for x in range(self.grid.width))
+
+class SoilGrid:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+        # one byte per cell, row major; numpy works on a view of the same memory
+        self.cells = bytearray(width * height)
+        self.array = np.frombuffer(self.cells, dtype = np.uint8).reshape(height, width) if np else None
+
+    def inside(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x, y):
+        return self.cells[y * self.width + x]
+
+    def has(self, x, y, flag):
+        return self.cells[y * self.width + x] & flag != 0
+
+    def set(self, x, y, flag):
+        self.cells[y * self.width + x] |= flag
+
+    def clear(self, x, y, flag):
+        self.cells[y * self.width + x] &= ~flag
+
+    def clear_all(self, flag):
+        # whole-grid updates map every byte through a 256 entry table in one C call
+        self.cells[:] = self.cells.translate(bytes(cell & ~flag for cell in range(256)))
+
+    def set_where(self, mask, value, flag):
+        # add flag to every cell whose bits under mask equal value
+        self.cells[:] = self.cells.translate(bytes(cell | flag if cell & mask == value else cell for cell in range(256)))
+
+    def find(self, mask, value):
+        # (x, y) of every cell whose bits under mask equal value
+        if np:
+            rows, cols = np.nonzero((self.array & mask) == value)
+            return list(zip(cols.tolist(), rows.tolist()))
+        matches = self.cells.translate(bytes(1 if cell & mask == value else 0 for cell in range(256)))
+        found = []
+        index = matches.find(1)
+        while index != -1:
+            found.append((index % self.width, index // self.width))
+            index = matches.find(1, index + 1)
+        return found
+
+    def neighbours(self, x, y, flag):
+        # 4 bit mask of the neighbours carrying flag: left 1, right 2, top 4, bottom 8
+        cells, width = self.cells, self.width
+        index = y * width + x
+        mask = 0
+        if x > 0 and cells[index - 1] & flag:
+            mask |= 1
+        if x < width - 1 and cells[index + 1] & flag:
+            mask |= 2
+        if y > 0 and cells[index - width] & flag:
+            mask |= 4
+        if y < self.height - 1 and cells[index + width] & flag:
+            mask |= 8
+        return mask
+
+    def neighbour_masks(self, flag):
+        # (x, y, neighbour mask) of every cell carrying flag
+        if np:
+            marked = (self.array & flag) != 0
+            masks = np.zeros(marked.shape, dtype = np.uint8)
+            masks[:, 1:] |= marked[:, :-1] * np.uint8(1)
+            masks[:, :-1] |= marked[:, 1:] * np.uint8(2)
+            masks[1:, :] |= marked[:-1, :] * np.uint8(4)
+            masks[:-1, :] |= marked[1:, :] * np.uint8(8)
+            rows, cols = np.nonzero(marked)
+            return list(zip(cols.tolist(), rows.tolist(), masks[rows, cols].tolist()))
+        return [(x, y, self.neighbours(x, y, flag)) for x, y in self.find(flag, flag)]
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height:
+            raise IndexError(y)
+        return GridRow(self, y)
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        return (GridRow(self, y) for y in range(self.height))
@@ -0,0 +1,10 @@
+class Inventory(dict):
+    # a dict of counts that reports every change, so cached HUD text knows when to redraw
+    def __init__(self, items, on_change):
+        super().__init__(items)
+        self.on_change = on_change
+
+    def __setitem__(self, key, value):
+        if self.get(key) != value:
+            super().__setitem__(key, value)
+            self.on_change()
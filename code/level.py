@@ -1,4 +1,5 @@
-import pygame 
+import pygame, os, struct, zlib, warnings
+from time import perf_counter
 from .settings import *
 from .player import Player
 from .overlay import Overlay
@@ -6,104 +7,126 @@ from .sprites import Generic, Barrier, VerticalBarrier, HorizontalBarrier, Water
 from .support import *
 from .transition import Transition
 from .soil import SoilLayer
+from .grid import PLANTED
 from .sky import Rain, Sky
 from .menu import Menu
-from pytmx.util_pygame import load_pygame
+from .controls import DeviceControls
+from .timer import game_scheduler, ui_scheduler
+from .assets import assets
+from .spatial import SpatialHash
+from .chunks import ChunkedLayer
+from .world import ChunkStreamer
+from .profiler import Profiler
+from .lighting import Lighting, Light
+from . import savegame
 from random import randint
 
 class Level:
-	def __init__(self):
+	def __init__(self, bake_static = BAKE_STATIC_LAYERS, controls = None, save_path = None, new_game = False, stream = STREAM_WORLD):
+		game_scheduler.reset()
+		ui_scheduler.reset()
 
 		# get the display surface
 		self.display_surface = pygame.display.get_surface()
 
 		# sprite groups
 		self.all_sprites = CameraGroup()
-		self.collision_sprites = CameraGroup()
+		self.collision_sprites = CollisionGroup()
 		self.tree_sprites = pygame.sprite.Group()
 		self.interaction_sprites = pygame.sprite.Group()
+		self.bake_static = bake_static
+		self.static_layers = {}
+		self.controls = controls or DeviceControls()
+		self.profiler = Profiler()
+		self.profiler_font = assets.font('./font/LycheeSoda.ttf', 20)
 		
   		# sky
 		self.rain = Rain(self.all_sprites)
 		self.raining = randint(0,10) > 7
 		self.sky = Sky()
+		self.lighting = Lighting(self.sky)
   
 		# setup everything
-		self.wheel = 0
 		self.soil_layer = SoilLayer(self.all_sprites, self.collision_sprites, self.raining)
+		self.world = ChunkStreamer(self.soil_layer) if stream else None
 		self.setup()
 		self.overlay = Overlay(self.player)
 		self.transition = Transition(self.reset, self.player)
   
 		# shop
 		self.shop_active = False
-		self.menu = Menu(self.player, self.toggle_shop, self.player.timers['interaction'])
+		self.menu = Menu(self.player, self.toggle_shop, self.player.timers['interaction'], self.controls)
   
 		# audio
-		self.success = pygame.mixer.Sound('./audio/success.wav')
+		self.success = assets.sound('./audio/success.wav')
 		self.success.set_volume(0.3)
   
-		self.music = pygame.mixer.Sound('./audio/music.mp3')
+		self.music = assets.sound('./audio/music.mp3')
 		self.music.set_volume(0.3)
 		self.music.play(loops=-1)
   
+		# saves, on top of the map that setup just built
+		self.save_path = save_path
+		self.saved_state = None
+		self.autosaver = savegame.Autosaver(save_path) if save_path else None
+		if save_path and not new_game and os.path.exists(save_path):
+			try:
+				savegame.load(self, save_path)
+			except (OSError, ValueError, struct.error, zlib.error) as error:
+				warnings.warn(f'could not load {save_path}, starting a new game: {error}')
+  
 	def setup(self):
-		tmx_data = load_pygame('./data/map.tmx')
+		tmx_data = assets.map('./data/map.tmx')
   
 		# house
 		# bottom
 		for layer in ['HouseFloor', 'HouseFurnitureBottom']:
 			for x, y, surf in tmx_data.get_layer_by_name(layer).tiles():
-				Generic((x * TILE_SIZE, y * TILE_SIZE), surf, self.all_sprites, LAYERS['house bottom'])
+				self.add_static((x * TILE_SIZE, y * TILE_SIZE), surf, LAYERS['house bottom'])
 		# main
 		for layer in ['HouseWalls', 'HouseFurnitureTop']:
 			for x, y, surf in tmx_data.get_layer_by_name(layer).tiles():
-				Generic((x * TILE_SIZE, y * TILE_SIZE), surf, self.all_sprites)
+				self.spawn(Generic, (x * TILE_SIZE, y * TILE_SIZE), surf, self.all_sprites)
     
 		# fence 
 		for x, y, surf in tmx_data.get_layer_by_name('Fence').tiles():
-			Generic((x * TILE_SIZE, y * TILE_SIZE), surf, [self.all_sprites, self.collision_sprites])
+			self.spawn(Generic, (x * TILE_SIZE, y * TILE_SIZE), surf, [self.all_sprites, self.collision_sprites])
    
 		# water
-		water_frames = import_folder('./graphics/water')
+		water_frames = assets.frames('./graphics/water')
 		for x, y, surf in tmx_data.get_layer_by_name('Water').tiles():
-			Water((x * TILE_SIZE, y * TILE_SIZE), water_frames, self.all_sprites)
+			self.spawn(Water, (x * TILE_SIZE, y * TILE_SIZE), water_frames, self.all_sprites)
 
 		# wild flower
 		for obj in tmx_data.get_layer_by_name('Decoration'):
-			WildFlower((obj.x, obj.y), obj.image, [self.all_sprites, self.collision_sprites])
+			self.spawn(WildFlower, (obj.x, obj.y), obj.image, [self.all_sprites, self.collision_sprites])
 	
 		# trees
 		for obj in tmx_data.get_layer_by_name('Trees'):
-			Tree(pos=(obj.x, obj.y),
+			self.spawn(Tree, (obj.x, obj.y),
         surf=obj.image,groups=[self.all_sprites, self.collision_sprites, self.tree_sprites],
         camera_group=self.all_sprites,
         name=obj.name,
         player_add=self.player_add)
   
 		# ground
-		Generic(
-			pos = (0,0),
-			surf = pygame.image.load('./graphics/world/ground.png').convert_alpha(),
-			groups = self.all_sprites,
-			z = LAYERS['ground']
-		)
+		self.add_static((0,0), assets.image('./graphics/world/ground.png'), LAYERS['ground'])
 
 		# collision tiles
 		for x, y, surf in tmx_data.get_layer_by_name('Collision').tiles():
-			Barrier((x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites)
+			self.spawn(Barrier, (x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites)
 		for x, y, surf in tmx_data.get_layer_by_name('CollisionVertical').tiles():
-			VerticalBarrier((x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites)
+			self.spawn(VerticalBarrier, (x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites)
 		for x, y, surf in tmx_data.get_layer_by_name('CollisionVerticalLeft').tiles():
-			VerticalBarrier((x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites, alignment='right')
+			self.spawn(VerticalBarrier, (x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites, alignment='right')
 		for x, y, surf in tmx_data.get_layer_by_name('CollisionVerticalRight').tiles():
-			VerticalBarrier((x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites, alignment='left')
+			self.spawn(VerticalBarrier, (x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites, alignment='left')
 		for x, y, surf in tmx_data.get_layer_by_name('CollisionHorizontal').tiles():
-			HorizontalBarrier((x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites)
+			self.spawn(HorizontalBarrier, (x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites)
 		for x, y, surf in tmx_data.get_layer_by_name('CollisionHorizontalLeft').tiles():
-			HorizontalBarrier((x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites, alignment='right')
+			self.spawn(HorizontalBarrier, (x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites, alignment='right')
 		for x, y, surf in tmx_data.get_layer_by_name('CollisionHorizontalRight').tiles():
-			HorizontalBarrier((x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites, alignment='left')
+			self.spawn(HorizontalBarrier, (x * TILE_SIZE, y * TILE_SIZE), surf, self.collision_sprites, alignment='left')
 
 		# player
 		for obj in tmx_data.get_layer_by_name('Player'):
@@ -114,7 +137,8 @@ class Level:
                          tree_sprites=self.tree_sprites,
                          interaction_sprites=self.interaction_sprites,
                          soil_layer=self.soil_layer,
-                         toggle_shop=self.toggle_shop)
+                         toggle_shop=self.toggle_shop,
+                         controls=self.controls)
     
 			if obj.name == 'Bed':
 				Interaction((obj.x, obj.y), (obj.width, obj.height), self.interaction_sprites, obj.name)
@@ -122,33 +146,83 @@ class Level:
 			if obj.name == 'Trader':
 				Interaction((obj.x, obj.y), (obj.width, obj.height), self.interaction_sprites, obj.name)
 
+		# lights
+		self.setup_lights(tmx_data)
+
+		# composite static layers
+		for layer in self.static_layers.values():
+			layer.bake()
+			
+		# the chunks around the player
+		if self.world:
+			self.world.update(self.player.rect.center)
+
+	def setup_lights(self, tmx_data):
+		# a glow at every window marked in the map's Lights layer
+		windows = [obj for obj in tmx_data.layernames.get('Lights', ()) if obj.name == 'Window']
+		if not windows:
+			warnings.warn('the map marks no windows in its Lights layer, houses are only lit from the floor')
+		for obj in windows:
+			self.lighting.add(Light((obj.x, obj.y), WINDOW_LIGHT_RADIUS, LIGHT_COLOURS['window']))
+
+		# one light filling each house, found as the connected areas of floor
+		floor = {(x, y) for x, y, _ in tmx_data.get_layer_by_name('HouseFloor').tiles()}
+		while floor:
+			stack = [floor.pop()]
+			area = pygame.Rect(stack[0], (1, 1))
+			while stack:
+				x, y = stack.pop()
+				area.union_ip((x, y, 1, 1))
+				for cell in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+					if cell in floor:
+						floor.remove(cell)
+						stack.append(cell)
+			radius = max(area.size) * TILE_SIZE // 2 + TILE_SIZE
+			self.lighting.add(Light((area.centerx * TILE_SIZE, area.centery * TILE_SIZE), radius, LIGHT_COLOURS['house']))
+
+	def spawn(self, factory, pos, *args, **kwargs):
+		# map sprites are made now, or by the streamer each time the camera nears their chunk
+		if self.world:
+			self.world.add(factory, pos, *args, **kwargs)
+		else:
+			factory(pos, *args, **kwargs)
+
+	def add_static(self, pos, surf, z):
+		if self.bake_static:
+			if z not in self.static_layers:
+				self.static_layers[z] = ChunkedLayer(z)
+				self.all_sprites.add_renderer(self.static_layers[z])
+			self.static_layers[z].add(pos, surf)
+		else:
+			Generic(pos, surf, self.all_sprites, z)
+
 	def player_add(self, item):   
 		self.player.item_inventory[item] += 1
   
 		self.success.play()
 
 	def plant_collision(self):
-		if self.soil_layer.plant_sprites:
-			for plant in self.soil_layer.plant_sprites.sprites():
-				if plant.harvestable and plant.rect.colliderect(self.player.hitbox):
+		# only ripe plants in the cells under the player, in the order they were planted
+		ripe = self.soil_layer.plant_columns.ripe
+		if ripe:
+			for plant in sorted(ripe.query(self.player.hitbox), key = self.all_sprites.order.__getitem__):
+				if plant.rect.colliderect(self.player.hitbox):
 					self.player_add(plant.plant_type)
 					Particle(plant.rect.topleft, plant.image, self.all_sprites, LAYERS['main'])
 					row = plant.rect.centery // TILE_SIZE
 					col = plant.rect.centerx // TILE_SIZE
-					self.soil_layer.grid[row][col].remove('P')
+					self.soil_layer.grid.clear(col, row, PLANTED)
 					plant.kill()
 	
 	def toggle_shop(self):
 		self.shop_active = not self.shop_active
 		self.player.timers['interaction'].activate()
   
-	def update_wheel(self):
-		self.player.wheel = self.wheel
-		self.menu.wheel = self.wheel
-    
 	def reset(self):
 		# plants
 		self.soil_layer.update_plants()
+		if self.world:
+			self.world.new_day()
 		
 		# watered soil
 		self.soil_layer.remove_water()
@@ -169,34 +243,86 @@ class Level:
    
 		# player direction
 		self.player.status = 'down_idle'
+  
+		self.autosave()
+  
+	def autosave(self):
+		# the write happens on the autosave thread, so the fade keeps its frame rate
+		if self.autosaver:
+			start = perf_counter()
+			state = savegame.snapshot(self)
+			if state != self.saved_state:
+				self.autosaver.save(state, perf_counter() - start)
+				self.saved_state = state
+  
+	def close(self):
+		self.controls.close()
+		self.profiler.dump()
+		if self.autosaver:
+			self.autosaver.close()
 
-	def run(self,dt):
+	def update(self, dt):
+		profiler = self.profiler
+		profiler.start()
+		ui_scheduler.advance(dt)
+		self.controls.update()
+		profiler.lap('input')
 		
-		# drawing logic
-		self.display_surface.fill('black')
-		self.all_sprites.custom_draw(self.player)
-		# self.all_sprites.draw_analytics(self.player)
-		# self.collision_sprites.draw_analytics(self.player)
-  
 		# updates
 		if self.shop_active:
-			self.menu.update()
-			self.player.timers['interaction'].update()
+			self.menu.input()
+			profiler.lap('menu')
 		else:
-			# game updates
+			# game updates, game time stands still while the shop is open
+			game_scheduler.advance(dt)
 			self.all_sprites.update(dt)
+			game_scheduler.run()
+			profiler.lap('sprites')
 			self.plant_collision()
+			profiler.lap('harvest')
+			if self.world:
+				self.world.update(self.player.rect.center)
+				profiler.lap('stream')
 
 			# weather
-			if self.raining:
-				self.rain.update(dt)
-			self.sky.display(dt)
-		self.update_wheel()
+			self.rain.update(dt, self.raining)
+			profiler.lap('rain')
+			self.sky.update(dt)
+			profiler.lap('sky')
 		
-		# transition and overlay
-		self.overlay.display()
+		# transition
+		if self.player.sleep:
+			self.transition.update()
+			profiler.lap('transition')
+		ui_scheduler.run()
+
+	def draw(self, alpha = 1):
+		profiler = self.profiler
+		profiler.start()
+		
+		# drawing logic
+		self.display_surface.fill('black')
+		self.all_sprites.custom_draw(self.player, alpha)
+		# self.all_sprites.draw_analytics(self.player)
+		profiler.lap('draw world')
+		
+		if self.shop_active:
+			self.menu.display()
+			profiler.lap('draw menu')
+		elif not self.player.sleep:
+			self.lighting.display(self.all_sprites.offset)
+			profiler.lap('draw lighting')
+		
+		# while sleeping the lighting and the fade share one pass, the overlay goes on top of it
 		if self.player.sleep:
-			self.transition.play()
+			if self.shop_active:
+				self.transition.display()
+			else:
+				self.lighting.display(self.all_sprites.offset, self.transition.colour)
+			profiler.lap('draw transition')
+		self.overlay.display()
+		profiler.lap('draw overlay')
+		profiler.draw(self.display_surface, self.profiler_font)
   
 class CameraGroup(pygame.sprite.Group):
     def __init__(self):
@@ -204,17 +330,79 @@ class CameraGroup(pygame.sprite.Group):
         self.display_surface = pygame.display.get_surface()
         self.offset = pygame.math.Vector2()
         
-    def custom_draw(self, player):
-        # calculate offset
-        self.offset.x = player.rect.centerx - SCREEN_WIDTH / 2
-        self.offset.y = player.rect.centery - SCREEN_HEIGHT / 2
+        # cached (z, bottom, insertion order) draw keys and a spatial index of rects,
+        # both only updated for sprites that were added or reported a move
+        self.sort_keys = {}
+        self.spatial = SpatialHash(CULL_CELL_SIZE)
+        self.order = {}
+        self.counter = 0
+        self.pending = {}
         
-        for layer in LAYERS.values():
-            for sprite in sorted(self.sprites(), key = lambda sprite: sprite.hitbox.bottom if sprite == player else sprite.rect.bottom):
-                if sprite.z == layer:
-                    offset_rect = sprite.rect.copy()
-                    offset_rect.center -= self.offset
-                    self.display_surface.blit(sprite.image, offset_rect)
+        # culling
+        self.camera_rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        
+        # non-sprite layers drawn beneath the sprites sharing their z
+        self.renderers = {}
+        
+    def add_renderer(self, renderer):
+        self.renderers.setdefault(renderer.z, []).append(renderer)
+        
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        
+        # sprites are added before their image, rect and z exist
+        if sprite not in self.order:
+            self.order[sprite] = self.counter
+            self.counter += 1
+        self.pending[sprite] = None
+        
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.order.pop(sprite, None)
+        self.pending.pop(sprite, None)
+        self.sort_keys.pop(sprite, None)
+        self.spatial.remove(sprite)
+        
+    def moved(self, sprite):
+        # called by sprites whose rect or z changed after they were added
+        if sprite in self.order:
+            self.pending[sprite] = None
+            
+    def sort_key(self, sprite, player):
+        bottom = sprite.hitbox.bottom if sprite == player else sprite.rect.bottom
+        return (sprite.z, bottom, self.order[sprite])
+        
+    def refresh(self, player):
+        # only new and moved sprites are re-keyed and re-indexed
+        for sprite in self.pending:
+            self.sort_keys[sprite] = self.sort_key(sprite, player)
+            self.spatial.insert(sprite, sprite.rect)
+        self.pending.clear()
+        
+    def custom_draw(self, player, alpha = 1):
+        # calculate offset from where the player is between the last two ticks,
+        # every other sprite is drawn where the last tick left it
+        player_rect = player.rect.copy()
+        player_rect.center = player.interpolate(alpha)
+        self.offset.x = player_rect.centerx - SCREEN_WIDTH / 2
+        self.offset.y = player_rect.centery - SCREEN_HEIGHT / 2
+        self.camera_rect.topleft = (int(self.offset.x) - 1, int(self.offset.y) - 1)
+        self.camera_rect.size = (SCREEN_WIDTH + 2, SCREEN_HEIGHT + 2)
+        
+        # the spatial index gives the sprites near the camera, sorted by their cached keys
+        self.refresh(player)
+        camera_rect = self.camera_rect
+        layers = {layer: [] for layer in LAYERS.values()}
+        for sprite in sorted(self.spatial.query(camera_rect), key = self.sort_keys.__getitem__):
+            rect = player_rect if sprite is player else sprite.rect
+            if rect.colliderect(camera_rect):
+                offset_rect = rect.copy()
+                offset_rect.center -= self.offset
+                layers[self.sort_keys[sprite][0]].append((sprite.image, offset_rect))
+        for layer, blits in layers.items():
+            for renderer in self.renderers.get(layer, ()):
+                renderer.draw(self.display_surface, self.offset, camera_rect)
+            self.display_surface.blits(blits, False)
     
     def draw_analytics(self, player):
         self.offset.x = player.rect.centerx - SCREEN_WIDTH / 2
@@ -240,4 +428,64 @@ class CameraGroup(pygame.sprite.Group):
                         if hasattr(sprite, 'hitbox'):
                             hitbox_rect = sprite.hitbox.copy()
                             hitbox_rect.center -= self.offset
-                            pygame.draw.rect(self.display_surface, 'pink', hitbox_rect, 5)
\ No newline at end of file
+                            pygame.draw.rect(self.display_surface, 'pink', hitbox_rect, 5)
+
+class CollisionGroup(pygame.sprite.Group):
+    def __init__(self):
+        super().__init__()
+        self.spatial = SpatialHash(TILE_SIZE)
+        self.unindexed = {}
+        
+        # insertion order, so candidates come back in the order a full walk would visit them
+        self.order = {}
+        self.counter = 0
+        
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        if sprite not in self.order:
+            self.order[sprite] = self.counter
+            self.counter += 1
+        
+        # hitboxes are created after the sprite joins its groups
+        self.unindexed[sprite] = None
+        
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.order.pop(sprite, None)
+        self.unindexed.pop(sprite, None)
+        self.spatial.remove(sprite)
+        
+    def reindex(self, sprite):
+        if sprite in self.spritedict:
+            self.unindexed[sprite] = None
+        
+    def flush(self):
+        for sprite in self.unindexed:
+            if hasattr(sprite, 'hitbox'):
+                self.spatial.insert(sprite, sprite.hitbox)
+        self.unindexed.clear()
+        
+    def nearby(self, rect):
+        # yields candidates for rect in insertion order, so resolving collisions
+        # against them gives the same result as walking the whole group
+        self.flush()
+        order = self.order.__getitem__
+        bounds = self.spatial.cell_bounds(rect)
+        candidates = sorted(self.spatial.query_bounds(bounds), key = order)
+        seen = set(candidates)
+        index = 0
+        while index < len(candidates):
+            sprite = candidates[index]
+            index += 1
+            yield sprite
+            
+            # the caller may have pushed rect into cells that were not queried
+            left, top, right, bottom = self.spatial.cell_bounds(rect)
+            if left < bounds[0] or top < bounds[1] or right > bounds[2] or bottom > bounds[3]:
+                bounds = (min(left, bounds[0]), min(top, bounds[1]), max(right, bounds[2]), max(bottom, bounds[3]))
+                last = order(sprite)
+                extra = [other for other in self.spatial.query_bounds(bounds) if other not in seen and order(other) > last]
+                if extra:
+                    seen.update(extra)
+                    candidates = sorted(candidates[index:] + extra, key = order)
+                    index = 0
@@ -0,0 +1,82 @@
+import pygame
+from .settings import *
+
+class Light:
+    def __init__(self, pos, radius, colour):
+        self.radius = radius
+        self.colour = colour
+        self.rect = pygame.Rect(0, 0, radius * 2, radius * 2)
+        self.rect.center = pos
+
+class Lighting:
+    def __init__(self, sky, chunk_size = LIGHT_CHUNK_SIZE, scale = LIGHT_SCALE):
+        self.display_surface = pygame.display.get_surface()
+        self.sky = sky
+        self.chunk_size = chunk_size
+        self.scale = scale
+        self.lights = []
+        self.version = 0
+
+        # falloff surfaces per (radius, colour, level), levels follow how dark the sky is
+        self.gradients = {}
+
+        # light map over the chunks under the camera, big enough for any camera position inside them
+        width = (-(-SCREEN_WIDTH // chunk_size) + 1) * chunk_size
+        height = (-(-SCREEN_HEIGHT // chunk_size) + 1) * chunk_size
+        self.light_map = pygame.Surface((width, height))
+        self.low_map = pygame.Surface((width // scale, height // scale)) if scale > 1 else self.light_map
+        self.map_key = None
+        self.composites = 0
+
+    def add(self, light):
+        self.lights.append(light)
+        self.version += 1
+        return light
+
+    def remove(self, light):
+        self.lights.remove(light)
+        self.version += 1
+
+    def gradient(self, radius, colour, level):
+        key = (radius, colour, level)
+        if key not in self.gradients:
+            # concentric rings from black at the radius to the full colour in the middle
+            size = radius // self.scale
+            surf = pygame.Surface((size * 2, size * 2))
+            strength = level / LIGHT_LEVELS
+            for ring in range(LIGHT_RINGS, 0, -1):
+                falloff = strength * (1 - (ring - 1) / LIGHT_RINGS)
+                pygame.draw.circle(surf, [round(value * falloff) for value in colour], (size, size), size * ring // LIGHT_RINGS)
+            self.gradients[key] = surf
+        return self.gradients[key]
+
+    def composite(self, region, ambient, level, lights):
+        # sky colour everywhere, lights added on top, scaled up once if drawn small
+        scale = self.scale
+        self.low_map.fill(ambient)
+        self.low_map.blits([(self.gradient(light.radius, light.colour, level), ((light.rect.x - region.x) // scale, (light.rect.y - region.y) // scale),
+                             None, pygame.BLEND_RGB_ADD) for light in lights], False)
+        if scale > 1:
+            pygame.transform.smoothscale(self.low_map, self.light_map.get_size(), self.light_map)
+        self.composites += 1
+
+    def display(self, offset, fade = 255):
+        sky = self.sky
+        ambient = sky.colour if fade == 255 else tuple(value * fade // 255 for value in sky.colour)
+        level = round(LIGHT_LEVELS * (1 - min(sky.colour) / 255) * fade / 255)
+
+        # without lights in view this is the plain sky tint
+        camera = pygame.Rect(int(offset.x), int(offset.y), SCREEN_WIDTH, SCREEN_HEIGHT)
+        size = self.chunk_size
+        region = self.light_map.get_rect(topleft = (camera.x // size * size, camera.y // size * size))
+        lights = [light for light in self.lights if light.rect.colliderect(region)] if level else []
+        if not lights:
+            sky.display(fade)
+            return
+
+        # the map is only rebuilt when the camera changes chunk, the sky changes colour or lights come and go
+        key = (region.topleft, ambient, level, self.version)
+        if key != self.map_key:
+            self.composite(region, ambient, level, lights)
+            self.map_key = key
+        self.display_surface.blit(self.light_map, (0, 0), camera.move(-region.x, -region.y), special_flags = pygame.BLEND_RGB_MULT)
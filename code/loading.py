@@ -0,0 +1,35 @@
+import pygame, sys
+from time import perf_counter
+from .settings import *
+from .assets import assets
+
+class LoadingScreen:
+    def __init__(self):
+        self.display_surface = pygame.display.get_surface()
+        self.font = assets.font('./font/LycheeSoda.ttf', 30)
+        self.bar = pygame.Rect(0, 0, SCREEN_WIDTH // 3, 24)
+        self.bar.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 30)
+        self.last = 0
+
+    def update(self, done, total, text = 'Loading'):
+        # called for every finished file, so redraws are capped; the last one always shows
+        now = perf_counter()
+        if done < total and now - self.last < 1 / LOADING_FPS:
+            return
+        self.last = now
+
+        # keep the window responsive while the workers decode
+        if pygame.event.get(pygame.QUIT):
+            pygame.quit()
+            sys.exit()
+        pygame.event.pump()
+
+        self.display_surface.fill('black')
+        text_surf = self.font.render(text, False, 'white')
+        self.display_surface.blit(text_surf, text_surf.get_rect(midbottom = (self.bar.centerx, self.bar.top - 10)))
+        pygame.draw.rect(self.display_surface, 'white', self.bar, 2, 4)
+        fill = self.bar.inflate(-8, -8)
+        fill.width = round(fill.width * done / max(total, 1))
+        if fill.width:
+            pygame.draw.rect(self.display_surface, 'white', fill)
+        pygame.display.update()
@@ -1,26 +1,63 @@
 import pygame, sys
+from time import perf_counter
 from .settings import *
 from .level import Level
+from .assets import assets
+from .loading import LoadingScreen
 
 class Game:
-	def __init__(self):
+	def __init__(self, tick_rate = TICK_RATE, fps_cap = FPS_CAP, controls = None, save_path = None, new_game = False, stream = STREAM_WORLD):
 		pygame.init()
 		self.screen = pygame.display.set_mode((SCREEN_WIDTH,SCREEN_HEIGHT))
 		pygame.display.set_caption('Sprout Land')
 		self.clock = pygame.time.Clock()
-		self.level = Level()
+		
+		# graphics and sounds decode on worker threads behind a progress bar, then the level is built from them
+		start = perf_counter()
+		loading = LoadingScreen()
+		assets.preload(PRELOAD_ASSETS, PRELOAD_SOUNDS, loading.update)
+		loading.update(1, 1, 'Building the farm')
+		middle = perf_counter()
+		self.level = Level(controls = controls, save_path = save_path, new_game = new_game, stream = stream)
+		self.startup_times = {'preload': middle - start, 'level': perf_counter() - middle}
 		pygame.mouse.set_visible(False)
+  
+		# fixed timestep
+		self.tick_time = 1 / tick_rate
+		self.fps_cap = fps_cap
+		self.accumulator = 0
+
+	def handle_events(self):
+		for event in pygame.event.get():
+			if event.type == pygame.QUIT:
+				self.level.close()
+				pygame.quit()
+				sys.exit()
+			if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+				self.level.profiler.toggle()
+			self.level.controls.handle_event(event)
 
 	def run(self):
 		while True:
-			self.level.wheel = 0
-			for event in pygame.event.get():
-				if event.type == pygame.QUIT:
-					pygame.quit()
-					sys.exit()
-				if event.type == pygame.MOUSEWHEEL:
-					self.level.wheel = event.y
-  
-			dt = self.clock.tick() / 1000
-			self.level.run(dt)
+			self.handle_events()
+   
+			# simulate in fixed steps, then draw between the last two of them
+			self.accumulator += min(self.clock.tick(self.fps_cap) / 1000, MAX_FRAME_TIME)
+			while self.accumulator >= self.tick_time:
+				self.level.update(self.tick_time)
+				self.accumulator -= self.tick_time
+			self.level.draw(self.accumulator / self.tick_time)
+			self.level.profiler.start()
 			pygame.display.update()
+			self.level.profiler.lap('display')
+			self.level.profiler.end_frame()
+
+	def run_headless(self, ticks):
+		# simulate as fast as possible without drawing
+		start = perf_counter()
+		for _ in range(ticks):
+			pygame.event.pump()
+			self.level.update(self.tick_time)
+			self.level.profiler.end_frame()
+		self.level.close()
+		return perf_counter() - start
@@ -0,0 +1,73 @@
+import os, io, sys, json, struct, argparse
+from hashlib import sha1
+import pygame
+from .settings import *
+from .support import frame_key
+
+# graphics folder -> [file, width, height, size in bytes, sha1] in frame order
+VERSION = 1
+IMAGE_TYPES = ('.png', '.jpg', '.bmp')
+
+def image_size(content):
+    # PNG keeps its size in the IHDR chunk, no need to decode the pixels
+    if content[:8] == b'\x89PNG\r\n\x1a\n':
+        return struct.unpack('>II', content[16:24])
+    return pygame.image.load(io.BytesIO(content)).get_size()
+
+def folder_key(path):
+    return os.path.normpath(path).replace(os.sep, '/')
+
+def build_manifest(root = './graphics'):
+    folders = {}
+    for folder, _, files in sorted(os.walk(root)):
+        images = sorted((name for name in files if name.lower().endswith(IMAGE_TYPES)), key = frame_key)
+        if not images:
+            continue
+        entries = []
+        for name in images:
+            with open(os.path.join(folder, name), 'rb') as file:
+                content = file.read()
+            width, height = image_size(content)
+            entries.append([name, width, height, len(content), sha1(content).hexdigest()])
+        folders[folder_key(folder)] = entries
+    return {'version': VERSION, 'folders': folders}
+
+def folder_matches(folder, entries):
+    # the cheap check the game makes at startup: the same images with the same byte sizes, no decoding or hashing
+    try:
+        sizes = {entry.name: entry.stat().st_size for entry in os.scandir(folder) if entry.name.lower().endswith(IMAGE_TYPES)}
+    except OSError:
+        return False
+    return sizes == {name: size for name, _, _, size, _ in entries}
+
+def read_manifest(path = MANIFEST_PATH):
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == VERSION else None
+
+def write_manifest(manifest, path = MANIFEST_PATH):
+    # one image per line keeps diffs readable
+    folders = ',\n'.join(f'  {json.dumps(folder)}: [\n' + ',\n'.join(f'   {json.dumps(entry)}' for entry in entries) + '\n  ]'
+                         for folder, entries in manifest['folders'].items())
+    with open(path, 'w') as file:
+        file.write(f'{{\n "version": {manifest["version"]},\n "folders": {{\n{folders}\n }}\n}}\n')
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = f'write or check {MANIFEST_PATH}, the frame order, sizes and hashes of every image under graphics/')
+    parser.add_argument('--check', action = 'store_true', help = 'exit with an error if the manifest is missing or out of date')
+    args = parser.parse_args(argv)
+    manifest = build_manifest()
+    if args.check:
+        if read_manifest() != manifest:
+            print(f'{MANIFEST_PATH} is out of date, run python -m code.manifest')
+            sys.exit(1)
+        print(f'{MANIFEST_PATH} is up to date')
+        return
+    write_manifest(manifest)
+    print(f"wrote {MANIFEST_PATH}: {sum(len(entries) for entries in manifest['folders'].values())} images in {len(manifest['folders'])} folders")
+
+if __name__ == '__main__':
+    main()
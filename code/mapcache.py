@@ -0,0 +1,180 @@
+import os, sys, json, struct, zlib
+from array import array
+from hashlib import sha1
+from xml.etree import ElementTree
+import pygame
+from pytmx.util_pygame import load_pygame
+
+MAGIC = b'SLMC'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+
+class TileLayer:
+    def __init__(self, name, width, tiles, images):
+        self.name = name
+        self.width = width
+        self.data = tiles
+        self.images = images
+
+    def tiles(self):
+        width = self.width
+        images = self.images
+        for index, tile in enumerate(self.data):
+            if tile:
+                yield index % width, index // width, images[tile - 1]
+
+class MapObject:
+    def __init__(self, name, type, x, y, width, height, image):
+        self.name = name
+        self.type = type
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.image = image
+
+class ObjectLayer(list):
+    def __init__(self, name, objects):
+        super().__init__(objects)
+        self.name = name
+
+class CompiledMap:
+    def __init__(self, width, height, tile_size, layers):
+        self.width = width
+        self.height = height
+        self.tilewidth = self.tileheight = tile_size
+        self.layers = layers
+        self.layernames = {layer.name: layer for layer in layers}
+
+    def get_layer_by_name(self, name):
+        return self.layernames[name]
+
+def map_key(path):
+    # the TMX file, its tilesets and every image they reference
+    digest = sha1()
+    pending = [path]
+    while pending:
+        file_path = pending.pop(0)
+        with open(file_path, 'rb') as file:
+            content = file.read()
+        digest.update(file_path.encode())
+        digest.update(content)
+        if file_path.endswith(('.tmx', '.tsx')):
+            folder = os.path.dirname(file_path)
+            for element in ElementTree.fromstring(content).iter():
+                if element.tag in ('tileset', 'image') and element.get('source'):
+                    pending.append(os.path.normpath(os.path.join(folder, element.get('source'))))
+    return digest.hexdigest()
+
+def pack_atlas(surfaces):
+    # shelf packing, tallest images first
+    width = 1024
+    while any(surf.get_width() > width for surf in surfaces):
+        width *= 2
+    order = sorted(range(len(surfaces)), key = lambda index: -surfaces[index].get_height())
+    rects = [None] * len(surfaces)
+    x = y = shelf = 0
+    for index in order:
+        w, h = surfaces[index].get_size()
+        if x + w > width:
+            x, y, shelf = 0, y + shelf, 0
+        rects[index] = (x, y, w, h)
+        x += w
+        shelf = max(shelf, h)
+    atlas = pygame.Surface((width, max(1, y + shelf)), pygame.SRCALPHA)
+    for surf, rect in zip(surfaces, rects):
+        atlas.blit(surf, rect[:2])
+    return atlas, rects
+
+def compile_map(tmx_data):
+    surfaces = []
+    indices = {}
+    def image_index(surf):
+        if surf is None:
+            return 0
+        if id(surf) not in indices:
+            surfaces.append(surf)
+            indices[id(surf)] = len(surfaces)
+        return indices[id(surf)]
+
+    layers = []
+    blobs = []
+    offset = 0
+    for layer in tmx_data.layers:
+        if hasattr(layer, 'tiles'):
+            data = array('H', bytes(2 * tmx_data.width * tmx_data.height))
+            for x, y, surf in layer.tiles():
+                data[y * tmx_data.width + x] = image_index(surf)
+            if sys.byteorder != 'little':
+                data.byteswap()
+            blob = data.tobytes()
+            layers.append({'name': layer.name, 'offset': offset, 'length': len(blob)})
+            blobs.append(blob)
+            offset += len(blob)
+        else:
+            objects = [[obj.name, getattr(obj, 'type', None), obj.x, obj.y, obj.width, obj.height, image_index(obj.image)] for obj in layer]
+            layers.append({'name': layer.name, 'objects': objects})
+
+    atlas, rects = pack_atlas(surfaces)
+    meta = {
+        'size': [tmx_data.width, tmx_data.height, tmx_data.tilewidth],
+        'layers': layers,
+        'atlas': [atlas.get_width(), atlas.get_height(), offset],
+        'rects': rects
+    }
+    blobs.append(pygame.image.tobytes(atlas, 'RGBA'))
+    return meta, b''.join(blobs)
+
+def write_cache(cache_path, key, meta, payload):
+    meta = json.dumps(dict(meta, key = key), separators = (',', ':')).encode()
+    temp_path = cache_path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(meta)))
+        file.write(meta)
+        file.write(zlib.compress(payload, 1))
+    os.replace(temp_path, cache_path)
+
+def read_cache(cache_path, key):
+    with open(cache_path, 'rb') as file:
+        magic, version, meta_length = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            return None
+        meta = json.loads(file.read(meta_length))
+        if meta['key'] != key:
+            return None
+        return meta, zlib.decompress(file.read())
+
+def build_map(meta, payload):
+    width, height, tile_size = meta['size']
+    atlas_w, atlas_h, atlas_offset = meta['atlas']
+    atlas = pygame.image.frombytes(payload[atlas_offset:], (atlas_w, atlas_h), 'RGBA').convert_alpha()
+    images = [atlas.subsurface(rect) for rect in meta['rects']]
+
+    layers = []
+    for layer in meta['layers']:
+        if 'objects' in layer:
+            objects = [MapObject(name, type, x, y, w, h, images[image - 1] if image else None)
+                       for name, type, x, y, w, h, image in layer['objects']]
+            layers.append(ObjectLayer(layer['name'], objects))
+        else:
+            data = array('H')
+            data.frombytes(payload[layer['offset']:layer['offset'] + layer['length']])
+            if sys.byteorder != 'little':
+                data.byteswap()
+            layers.append(TileLayer(layer['name'], width, data, images))
+    return CompiledMap(width, height, tile_size, layers)
+
+def load_map(path, cache_path = None):
+    cache_path = cache_path or path + '.cache'
+    key = map_key(path)
+    try:
+        cached = read_cache(cache_path, key)
+    except (OSError, ValueError, KeyError, struct.error, zlib.error):
+        cached = None
+
+    if cached is None:
+        meta, payload = compile_map(load_pygame(path))
+        write_cache(cache_path, key, meta, payload)
+    else:
+        meta, payload = cached
+    return build_map(meta, payload)
@@ -1,17 +1,18 @@
 import pygame
 from .settings import *
-from .timer import Timer
+from .timer import Timer, ui_scheduler
+from .assets import assets
 
 class Menu:
-    def __init__(self, player, toggle_menu, toggle_timer):
+    def __init__(self, player, toggle_menu, toggle_timer, controls):
         
         # setup
-        self.wheel = 0
         self.display_surface = pygame.display.get_surface()
-        self.font = pygame.font.Font('./font/LycheeSoda.ttf', 30)
+        self.font = assets.font('./font/LycheeSoda.ttf', 30)
         self.player = player
         self.toggle_menu = toggle_menu
         self.toggle_timer = toggle_timer
+        self.controls = controls
         
         # options
         self.width = 400
@@ -26,10 +27,14 @@ class Menu:
         
         # movement
         self.index = 0
-        self.timer = Timer(150)
+        
+        # composed panel and money label, redrawn only when the inventory or selection changes
+        self.panel_key = None
+        self.money_key = None
+        self.timer = Timer(150, scheduler = ui_scheduler)
         
         # audio
-        self.success = pygame.mixer.Sound('./audio/success.wav')
+        self.success = assets.sound('./audio/success.wav')
         self.success.set_volume(0.3)
         
     def setup(self):
@@ -49,54 +54,69 @@ class Menu:
         self.buy_text = self.font.render('buy', False, 'Black')
         self.sell_text = self.font.render('sell', False, 'Black')
     
-    def display_money(self):
+    def blank_surface(self, size):
+        # colorkeyed rather than per-pixel alpha, the panels are opaque apart from their corners
+        surface = pygame.Surface(size).convert()
+        surface.fill(PANEL_COLORKEY)
+        surface.set_colorkey(PANEL_COLORKEY)
+        return surface
+        
+    def render_money(self):
         text_surf = self.font.render(f'${self.player.money}', False, 'Black')
         text_rect = text_surf.get_rect(midbottom = (SCREEN_WIDTH / 2, SCREEN_HEIGHT - 40))
+        bg_rect = text_rect.inflate(20, 10)
         
-        pygame.draw.rect(self.display_surface, 'White', text_rect.copy().inflate(20, 10), 0, 6)
-        self.display_surface.blit(text_surf, text_rect)
+        self.money_surf = self.blank_surface(bg_rect.size)
+        pygame.draw.rect(self.money_surf, 'White', self.money_surf.get_rect(), 0, 6)
+        self.money_surf.blit(text_surf, text_rect.move(-bg_rect.left, -bg_rect.top))
+        self.money_rect = bg_rect
         
-    def display_entry(self, text_surf, amount, top, selected):
+    def render_entry(self, surface, text_surf, amount, top, selected):
         
         # background
-        bg_rect = pygame.Rect(self.main_rect.left, top, self.width, text_surf.get_height() + self.padding * 2)
-        pygame.draw.rect(self.display_surface, 'White', bg_rect, 0, 6)
+        bg_rect = pygame.Rect(0, top, self.width, text_surf.get_height() + self.padding * 2)
+        pygame.draw.rect(surface, 'White', bg_rect, 0, 6)
         
         # text
-        text_rect = text_surf.get_rect(midleft = (self.main_rect.left + 20, bg_rect.centery))
-        self.display_surface.blit(text_surf, text_rect)
+        text_rect = text_surf.get_rect(midleft = (20, bg_rect.centery))
+        surface.blit(text_surf, text_rect)
         
         # amount
         amount_surf = self.font.render(f'{amount}', False, 'Black')
-        amount_rect = amount_surf.get_rect(midright = (self.main_rect.right - 20, bg_rect.centery))
-        self.display_surface.blit(amount_surf, amount_rect)
+        amount_rect = amount_surf.get_rect(midright = (self.width - 20, bg_rect.centery))
+        surface.blit(amount_surf, amount_rect)
         
         # selected
         if selected:
-            pygame.draw.rect(self.display_surface, 'Black', bg_rect, 4, 4)
+            pygame.draw.rect(surface, 'Black', bg_rect, 4, 4)
             if self.index <= self.sell_border: # sell
-                pos_rect = self.sell_text.get_rect(midleft = (self.main_rect.left + 225, bg_rect.centery))
-                self.display_surface.blit(self.sell_text, pos_rect)
+                pos_rect = self.sell_text.get_rect(midleft = (225, bg_rect.centery))
+                surface.blit(self.sell_text, pos_rect)
             else: # buy
-                pos_rect = self.buy_text.get_rect(midleft = (self.main_rect.left + 225, bg_rect.centery))
-                self.display_surface.blit(self.buy_text, pos_rect)
+                pos_rect = self.buy_text.get_rect(midleft = (225, bg_rect.centery))
+                surface.blit(self.buy_text, pos_rect)
+                
+    def render_panel(self):
+        self.panel_surf = self.blank_surface(self.main_rect.size)
+        amount_list = list(self.player.item_inventory.values()) + list(self.player.seed_inventory.values())
+        for index, text_surf in enumerate(self.text_surfs):
+            top = index * (text_surf.get_height() + (self.padding * 2) + self.space)
+            self.render_entry(self.panel_surf, text_surf, amount_list[index], top, index == self.index)
         
     def input(self):
-        keys = pygame.key.get_pressed()
-        self.timer.update()
-        mouse = pygame.mouse.get_pressed()
+        actions = self.controls.actions
         
-        if (keys[pygame.K_ESCAPE] or mouse[2]) and not self.toggle_timer.active:
+        if actions.back and not self.toggle_timer.active:
             self.toggle_menu()
         
         if not self.timer.active:
-            if keys[pygame.K_UP] or keys[pygame.K_w] or self.wheel > 0:
+            if actions.move_y < 0 or actions.scroll > 0:
                 self.index -= 1
                 self.timer.activate()
-            if keys[pygame.K_DOWN] or keys[pygame.K_s] or self.wheel < 0:
+            if actions.move_y > 0 or actions.scroll < 0:
                 self.index += 1
                 self.timer.activate()
-            if keys[pygame.K_SPACE] or mouse[0]:
+            if actions.use_tool:
                 self.timer.activate()
                 
                 # get item
@@ -119,12 +139,14 @@ class Menu:
         
         self.index = self.index % len(self.options)
         
-    def update(self):
-        self.input()
-        self.display_money()
-        for index, text_surf in enumerate(self.text_surfs):
-            top = self.main_rect.top + index * (text_surf.get_height() + (self.padding * 2) + self.space)
-            amount_list = list(self.player.item_inventory.values()) + list(self.player.seed_inventory.values())
-            amount = amount_list[index]
-            self.display_entry(text_surf, amount, top, index == self.index)
-            
\ No newline at end of file
+    def display(self):
+        if self.money_key != self.player.money:
+            self.money_key = self.player.money
+            self.render_money()
+        if self.panel_key != (self.player.inventory_version, self.index):
+            self.panel_key = (self.player.inventory_version, self.index)
+            self.render_panel()
+        
+        self.display_surface.blit(self.money_surf, self.money_rect)
+        self.display_surface.blit(self.panel_surf, self.main_rect)
+
@@ -1,18 +1,26 @@
 import pygame
 from .settings import *
+from .assets import assets
 
 class Overlay:
     def __init__(self, player):
         
         # general setup
         self.display_surface = pygame.display.get_surface()
-        self.font = pygame.font.Font('./font/LycheeSoda.ttf', 30)
+        self.font = assets.font('./font/LycheeSoda.ttf', 30)
         self.player = player
         
         # imports
         overlay_path = './graphics/overlay/'
-        self.tools_surf = {tool: pygame.image.load(f'{overlay_path}{tool}.png').convert_alpha() for tool in player.tools}
-        self.seeds_surf = {seed: pygame.image.load(f'{overlay_path}{seed}.png').convert_alpha() for seed in player.seeds}
+        self.tools_surf = {tool: assets.image(f'{overlay_path}{tool}.png') for tool in player.tools}
+        self.seeds_surf = {seed: assets.image(f'{overlay_path}{seed}.png') for seed in player.seeds}
+        
+        # seed count text, rendered again only when the selection or the inventory changes
+        self.seed_text_key = None
+        
+    def render_seed_text(self):
+        self.seed_text_surf = self.font.render(f'{self.player.seed_inventory[self.player.selected_seed]}', False, 'Black')
+        self.seed_text_rect = self.seed_text_surf.get_rect(midbottom = (OVERLAY_POSITIONS['seed'][0] + 20, OVERLAY_POSITIONS['seed'][1] + 10))
         
     def display(self):
         
@@ -24,8 +32,9 @@ class Overlay:
         # seed
         seed_surf = self.seeds_surf[self.player.selected_seed]
         seed_rect = seed_surf.get_rect(midbottom = OVERLAY_POSITIONS['seed'])
-        seed_text_surf = self.font.render(f'{self.player.seed_inventory[self.player.selected_seed]}', False, 'Black')
-        seed_text_rect = seed_text_surf.get_rect(midbottom = (OVERLAY_POSITIONS['seed'][0] + 20, OVERLAY_POSITIONS['seed'][1] + 10))
+        if self.seed_text_key != (self.player.selected_seed, self.player.inventory_version):
+            self.seed_text_key = (self.player.selected_seed, self.player.inventory_version)
+            self.render_seed_text()
         if self.player.seed_inventory[self.player.selected_seed] > 0:
             self.display_surface.blit(seed_surf, seed_rect)
-            self.display_surface.blit(seed_text_surf, seed_text_rect)
\ No newline at end of file
+            self.display_surface.blit(self.seed_text_surf, self.seed_text_rect)
\ No newline at end of file
@@ -1,10 +1,12 @@
 import pygame
 from .settings import *
 from .support import *
-from .timer import Timer
+from .timer import Timer, ui_scheduler
+from .assets import assets
+from .inventory import Inventory
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, pos, group, collision_sprites, tree_sprites, interaction_sprites, soil_layer, toggle_shop):
+    def __init__(self, pos, group, collision_sprites, tree_sprites, interaction_sprites, soil_layer, toggle_shop, controls):
         super().__init__(group)
         
         # animation and image setup
@@ -13,7 +15,6 @@ class Player(pygame.sprite.Sprite):
         self.frame_index = 0
         
         # general setup
-        self.wheel = 0
         self.image = self.animations[self.status][self.frame_index]
         self.rect = self.image.get_rect(center=pos)
         self.z = LAYERS['main']
@@ -21,6 +22,7 @@ class Player(pygame.sprite.Sprite):
         # movement attributes
         self.direction = pygame.math.Vector2()
         self.pos = pygame.math.Vector2(self.rect.center)
+        self.previous_center = self.rect.center
         self.speed = 200
         
         # collision
@@ -33,7 +35,7 @@ class Player(pygame.sprite.Sprite):
             'tool_switch': Timer(150),
             'seed_use': Timer(200, self.use_seed),
             'seed_switch': Timer(200),
-            'interaction': Timer(200),
+            'interaction': Timer(200, scheduler = ui_scheduler),
             'sleep': Timer(1000)
         }
         
@@ -47,18 +49,19 @@ class Player(pygame.sprite.Sprite):
         self.seed_index = 0
         self.selected_seed = self.seeds[self.seed_index]
         
-        # inventory
-        self.item_inventory = {
+        # inventory, version goes up whenever a count or the money changes
+        self.inventory_version = 0
+        self.item_inventory = Inventory({
             'wood':     0,
             'apple':    0,
             'corn':     0,
             'tomato':   0
-        }
-        self.seed_inventory = {
+        }, self.inventory_changed)
+        self.seed_inventory = Inventory({
             'corn':     5,
             'tomato':   5
-        }
-        self.money = 0
+        }, self.inventory_changed)
+        self._money = 0
         
         # interactions
         self.tree_sprites = tree_sprites
@@ -66,9 +69,10 @@ class Player(pygame.sprite.Sprite):
         self.sleep = False
         self.soil_layer = soil_layer
         self.toggle_shop = toggle_shop
+        self.controls = controls
         
         # audio
-        self.watering = pygame.mixer.Sound('./audio/water.mp3')
+        self.watering = assets.sound('./audio/water.mp3')
         self.watering.set_volume(0.2)
         
     def import_assets(self):
@@ -77,9 +81,9 @@ class Player(pygame.sprite.Sprite):
                            'up_hoe':[], 'down_hoe':[], 'left_hoe':[], 'right_hoe':[],
                            'up_axe':[], 'down_axe':[], 'left_axe':[], 'right_axe':[],
                            'up_water':[], 'down_water':[], 'left_water':[], 'right_water':[]}
+        character = assets.animations('./graphics/character')
         for animation in self.animations.keys():
-            full_path = './graphics/character/' + animation
-            self.animations[animation] = import_folder(full_path)
+            self.animations[animation] = character[animation]
         
     def animate(self, dt):
         
@@ -95,51 +99,38 @@ class Player(pygame.sprite.Sprite):
         self.image = self.animations[self.status][int(self.frame_index)]
     
     def input(self):
-        keys = pygame.key.get_pressed()
-        mouse = pygame.mouse.get_pressed()
-                
-        if mouse[0] or mouse[2]:
-            pygame.mouse.set_visible(False)
-            
-        if keys[pygame.K_ESCAPE] and not self.timers['interaction'].active:
-            pygame.mouse.set_visible(True)
+        actions = self.controls.actions
         
         if not (self.timers['tool_use'].active or self.sleep):
             # directions
             # move player up or down
-            if keys[pygame.K_UP] or keys[pygame.K_w]:
-                self.direction.y = -1
+            self.direction.y = actions.move_y
+            if actions.move_y < 0:
                 self.status = 'up'
-            elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
-                self.direction.y = 1
+            elif actions.move_y > 0:
                 self.status = 'down'
-            else:
-                self.direction.y = 0
             
             # move player left or right
-            if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-                self.direction.x = -1
+            self.direction.x = actions.move_x
+            if actions.move_x < 0:
                 self.status = 'left'
-            elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-                self.direction.x = 1
+            elif actions.move_x > 0:
                 self.status = 'right'
-            else:
-                self.direction.x = 0
                 
             # tool use
-            if keys[pygame.K_SPACE] or mouse[0]:
+            if actions.use_tool:
                 self.timers['tool_use'].activate()
                 self.direction = pygame.math.Vector2()
                 self.frame_index = 0 
                 
             # change tool
-            if (keys[pygame.K_q] or self.wheel < 0) and not self.timers['tool_switch'].active:
+            if actions.switch_tool > 0 and not self.timers['tool_switch'].active:
                 self.timers['tool_switch'].activate()
                 self.tool_index += 1
                 if self.tool_index >= len(self.tools):
                     self.tool_index = 0
                 self.selected_tool = self.tools[self.tool_index]
-            elif self.wheel > 0 and not self.timers['tool_switch'].active:
+            elif actions.switch_tool < 0 and not self.timers['tool_switch'].active:
                 self.timers['tool_switch'].activate()
                 self.tool_index -= 1
                 if self.tool_index <= 0:
@@ -147,13 +138,13 @@ class Player(pygame.sprite.Sprite):
                 self.selected_tool = self.tools[self.tool_index]
                 
             # seed use
-            if keys[pygame.K_LSHIFT] or mouse[2]:
+            if actions.use_seed:
                 self.timers['seed_use'].activate()
                 self.direction = pygame.math.Vector2()
                 self.frame_index = 0
             
             # change seed
-            if keys[pygame.K_e] and not self.timers['seed_switch'].active:
+            if actions.switch_seed and not self.timers['seed_switch'].active:
                 self.timers['seed_switch'].activate()
                 self.seed_index += 1
                 if self.seed_index >= len(self.seeds):
@@ -162,7 +153,7 @@ class Player(pygame.sprite.Sprite):
                 
             # interact
             if not self.timers['interaction'].active:
-                if keys[pygame.K_RETURN] or mouse[2]:
+                if actions.interact:
                     collided_interaction_sprite = pygame.sprite.spritecollide(self, self.interaction, False)
                     if collided_interaction_sprite:
                         self.timers['interaction'].activate()
@@ -202,24 +193,23 @@ class Player(pygame.sprite.Sprite):
         self.collision('vertical')
     
     def collision(self, direction):
-        for sprite in self.collision_sprites.sprites():
-            if hasattr(sprite, 'hitbox'):
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if direction == 'horizontal':
-                        if self.direction.x > 0: # moving right
-                            self.hitbox.right = sprite.hitbox.left
-                        if self.direction.x < 0: # moving left
-                            self.hitbox.left = sprite.hitbox.right
-                        self.rect.centerx = self.hitbox.centerx
-                        self.pos.x = self.hitbox.centerx
-                        
-                    if direction == 'vertical':
-                        if self.direction.y > 0: # moving down
-                            self.hitbox.bottom = sprite.hitbox.top
-                        if self.direction.y < 0: # moving up
-                            self.hitbox.top = sprite.hitbox.bottom
-                        self.rect.centery = self.hitbox.centery - PLAYER_HITBOX_OFFSET['vertical']
-                        self.pos.y = self.hitbox.centery - PLAYER_HITBOX_OFFSET['vertical']
+        for sprite in self.collision_sprites.nearby(self.hitbox):
+            if sprite.hitbox.colliderect(self.hitbox):
+                if direction == 'horizontal':
+                    if self.direction.x > 0: # moving right
+                        self.hitbox.right = sprite.hitbox.left
+                    if self.direction.x < 0: # moving left
+                        self.hitbox.left = sprite.hitbox.right
+                    self.rect.centerx = self.hitbox.centerx
+                    self.pos.x = self.hitbox.centerx
+                    
+                if direction == 'vertical':
+                    if self.direction.y > 0: # moving down
+                        self.hitbox.bottom = sprite.hitbox.top
+                    if self.direction.y < 0: # moving up
+                        self.hitbox.top = sprite.hitbox.bottom
+                    self.rect.centery = self.hitbox.centery - PLAYER_HITBOX_OFFSET['vertical']
+                    self.pos.y = self.hitbox.centery - PLAYER_HITBOX_OFFSET['vertical']
                         
     def get_target_position(self):
         self.target_pos = self.rect.center + PLAYER_TOOL_OFFSET[self.status.split('_')[0]]
@@ -243,15 +233,41 @@ class Player(pygame.sprite.Sprite):
             planted = self.soil_layer.plant_seed(self.target_pos, self.selected_seed)
             self.seed_inventory[self.selected_seed] -= 1 if planted else 0
 
-    def update_timers(self):
-        for timer in self.timers.values():
-            timer.update()
+    def place(self, x, y):
+        self.pos.update(x, y)
+        self.rect.center = (x, y)
+        self.hitbox.centerx = round(x)
+        self.hitbox.centery = round(y) + PLAYER_HITBOX_OFFSET['vertical']
+        self.previous_center = self.rect.center
+        moved(self)
+        
+    def inventory_changed(self):
+        self.inventory_version += 1
+
+    @property
+    def money(self):
+        return self._money
+
+    @money.setter
+    def money(self, value):
+        if value != self._money:
+            self._money = value
+            self.inventory_changed()
+
+    def interpolate(self, alpha):
+        # rendered position between the previous tick and this one
+        if alpha >= 1:
+            return self.rect.center
+        x = self.previous_center[0] + (self.rect.centerx - self.previous_center[0]) * alpha
+        y = self.previous_center[1] + (self.rect.centery - self.previous_center[1]) * alpha
+        return round(x), round(y)
 
     def update(self, dt):
+        self.previous_center = self.rect.center
         self.input()
         self.get_status()
         self.move(dt)
+        moved(self)
         self.animate(dt)
-        self.update_timers()
         self.get_target_position()
         
\ No newline at end of file
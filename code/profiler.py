@@ -0,0 +1,101 @@
+import csv, json
+from collections import deque
+from time import perf_counter
+import pygame
+from .settings import *
+
+GRAPH_COLOURS = ['#e6194b', '#3cb44b', '#ffe119', '#4363d8', '#f58231', '#911eb4', '#46f0f0', '#f032e6', '#bcf60c', '#fabebe', '#008080', '#e6beff']
+
+class Profiler:
+    def __init__(self, window = PROFILER_WINDOW):
+        # collecting costs a perf_counter call per stage, so it stays off until asked for
+        self.enabled = False
+        self.visible = False
+        self.window = deque(maxlen = window)
+        self.names = []
+        self.stages = {}
+        self.last = 0
+        self.frame = 0
+
+        # every frame since the trace started, written out by dump
+        self.trace = None
+        self.trace_path = None
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.enabled = self.visible or self.trace is not None
+
+    def record(self, path):
+        self.enabled = True
+        self.trace = []
+        self.trace_path = path
+
+    def start(self):
+        if self.enabled:
+            self.last = perf_counter()
+
+    def lap(self, name):
+        # time since the last start or lap goes to name
+        if self.enabled:
+            now = perf_counter()
+            self.stages[name] = self.stages.get(name, 0) + now - self.last
+            self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        for name in self.stages:
+            if name not in self.names:
+                self.names.append(name)
+        self.window.append(self.stages)
+        if self.trace is not None:
+            self.trace.append((self.frame, self.stages))
+        self.stages = {}
+        self.frame += 1
+
+    def averages(self):
+        # mean milliseconds per frame for each stage over the window
+        frames = len(self.window) or 1
+        return {name: sum(stages.get(name, 0) for stages in self.window) * 1000 / frames for name in self.names}
+
+    def dump(self, path = None):
+        path = path or self.trace_path
+        if not path or self.trace is None:
+            return
+        rows = [[frame] + [round(stages.get(name, 0) * 1000, 4) for name in self.names] for frame, stages in self.trace]
+        with open(path, 'w', newline = '') as file:
+            if path.endswith('.csv'):
+                writer = csv.writer(file)
+                writer.writerow(['frame'] + self.names)
+                writer.writerows(rows)
+            else:
+                json.dump({'unit': 'ms', 'stages': self.names, 'frames': rows}, file)
+
+    def draw(self, surface, font):
+        if not self.visible:
+            return
+
+        # stacked bar per frame, newest on the right, with a line at the tick budget
+        width, height = self.window.maxlen, 120
+        scale = height / (2000 / TICK_RATE)
+        graph = pygame.Rect(SCREEN_WIDTH - width - 10, 10, width, height)
+        pygame.draw.rect(surface, 'black', graph)
+        colours = {name: GRAPH_COLOURS[index % len(GRAPH_COLOURS)] for index, name in enumerate(self.names)}
+        x = graph.right - len(self.window)
+        for stages in self.window:
+            y = graph.bottom
+            for name, seconds in stages.items():
+                bar = min(round(seconds * 1000 * scale), y - graph.top)
+                if bar > 0:
+                    y -= bar
+                    pygame.draw.line(surface, colours[name], (x, y), (x, y + bar - 1))
+            x += 1
+        budget_y = graph.bottom - round(1000 / TICK_RATE * scale)
+        pygame.draw.line(surface, 'white', (graph.left, budget_y), (graph.right - 1, budget_y))
+
+        # legend with the mean of each stage
+        y = graph.bottom + 4
+        for name, ms in self.averages().items():
+            text_surf = font.render(f'{name} {ms:.2f} ms', False, colours[name], 'black')
+            surface.blit(text_surf, (graph.left, y))
+            y += text_surf.get_height()
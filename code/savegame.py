@@ -0,0 +1,211 @@
+import os, math, struct, zlib, threading, queue
+from time import perf_counter
+from collections import namedtuple
+from .settings import *
+from .grid import HOED, PLANTED
+
+# file: header, then one zlib compressed block of fixed size records
+MAGIC = b'SLSV'
+VERSION = 3
+HEADER = struct.Struct('<4sH')
+PLAYER = struct.Struct('<ddBBBq')
+COUNT = struct.Struct('<I')
+GRID = struct.Struct('<HH')
+PLANT = struct.Struct('<HHBd')
+TREE = struct.Struct('<bBB')
+APPLE = struct.Struct('<hh')
+
+# apple count of a tree that grows a fresh set when it next loads
+FRESH_APPLES = 0xFF
+
+PLANT_TYPES = list(GROW_SPEED)
+
+# plain values copied out of a level, safe to encode away from the sprites they came from
+Snapshot = namedtuple('Snapshot', ['player', 'items', 'seeds', 'width', 'height', 'cells', 'plants', 'trees'])
+
+def snapshot(level):
+    player = level.player
+    grid = level.soil_layer.grid
+    # a streamed world also holds the plants and trees of chunks that are not loaded
+    if level.world:
+        plants = level.world.plant_states()
+        trees = level.world.tree_states()
+    else:
+        plants = level.soil_layer.plant_states()
+        trees = [tree.save_state() for tree in level.tree_sprites]
+    return Snapshot(
+        player = (player.pos.x, player.pos.y, player.tool_index, player.seed_index, level.raining, player.money),
+        items = list(player.item_inventory.values()),
+        seeds = list(player.seed_inventory.values()),
+        width = grid.width,
+        height = grid.height,
+        cells = bytes(grid.cells),
+        plants = plants,
+        trees = trees)
+
+def encode(state):
+    parts = [PLAYER.pack(*state.player)]
+    for counts in (state.items, state.seeds):
+        parts.append(COUNT.pack(len(counts)))
+        parts.append(struct.pack(f'<{len(counts)}I', *counts))
+    parts.append(GRID.pack(state.width, state.height))
+    parts.append(state.cells)
+    parts.append(COUNT.pack(len(state.plants)))
+    parts.extend(PLANT.pack(col, row, PLANT_TYPES.index(plant_type), age) for col, row, plant_type, age in state.plants)
+    parts.append(COUNT.pack(len(state.trees)))
+    for health, alive, apples in state.trees:
+        if apples is None:
+            parts.append(TREE.pack(max(-128, health), alive, FRESH_APPLES))
+            continue
+        parts.append(TREE.pack(max(-128, health), alive, len(apples)))
+        parts.extend(APPLE.pack(*apple) for apple in apples)
+    return HEADER.pack(MAGIC, VERSION) + zlib.compress(b''.join(parts), 1)
+
+def decode(data):
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('not a Sprout Land save, or saved by another version')
+    payload = zlib.decompress(data[HEADER.size:])
+
+    offset = 0
+    def read(record):
+        nonlocal offset
+        values = record.unpack_from(payload, offset)
+        offset += record.size
+        return values
+
+    player = read(PLAYER)
+    inventories = []
+    for _ in range(2):
+        count, = read(COUNT)
+        inventories.append(list(read(struct.Struct(f'<{count}I'))))
+    width, height = read(GRID)
+    cells = payload[offset:offset + width * height]
+    offset += width * height
+    if len(cells) != width * height:
+        raise ValueError('save is cut short')
+
+    # every plant needs a hoed and planted cell of its own, or restoring it would fail halfway
+    count, = read(COUNT)
+    plants = []
+    planted = set()
+    for _ in range(count):
+        col, row, plant_type, age = read(PLANT)
+        if col >= width or row >= height or cells[row * width + col] & (HOED | PLANTED) != HOED | PLANTED or (col, row) in planted:
+            raise ValueError(f'save has a plant on cell ({col}, {row}) that cannot hold one')
+        if plant_type >= len(PLANT_TYPES) or not math.isfinite(age) or age < 0:
+            raise ValueError(f'save has a plant on cell ({col}, {row}) of unknown type or age')
+        planted.add((col, row))
+        plants.append((col, row, PLANT_TYPES[plant_type], age))
+    # and every planted cell needs its plant, or it could never be planted again
+    for index in range(width * height):
+        if cells[index] & PLANTED and (index % width, index // width) not in planted:
+            raise ValueError(f'save has a planted cell ({index % width}, {index // width}) without a plant')
+    count, = read(COUNT)
+    trees = []
+    for _ in range(count):
+        health, alive, apple_count = read(TREE)
+        apples = None if apple_count == FRESH_APPLES else [read(APPLE) for _ in range(apple_count)]
+        trees.append((health, bool(alive), apples))
+    if offset != len(payload):
+        raise ValueError('save has data past its end')
+    return Snapshot(player, inventories[0], inventories[1], width, height, cells, plants, trees)
+
+def restore(level, state):
+    # the map and its sprites come from setup, only what the player changed is replaced,
+    # and nothing is replaced until the whole save is known to fit
+    player = level.player
+    grid = level.soil_layer.grid
+    trees = level.world.trees if level.world else level.tree_sprites.sprites()
+    if (state.width, state.height) != (grid.width, grid.height) or len(state.trees) != len(trees):
+        raise ValueError('save does not match this map')
+    x, y, tool_index, seed_index, raining, money = state.player
+    if not (math.isfinite(x) and math.isfinite(y)) or tool_index >= len(player.tools) or seed_index >= len(player.seeds):
+        raise ValueError('save has a player this game cannot place')
+
+    player.tool_index, player.seed_index, player.money = tool_index, seed_index, money
+    player.place(x, y)
+    player.selected_tool = player.tools[player.tool_index]
+    player.selected_seed = player.seeds[player.seed_index]
+    for inventory, counts in ((player.item_inventory, state.items), (player.seed_inventory, state.seeds)):
+        for item, count in zip(list(inventory), counts):
+            inventory[item] = count
+    level.raining = level.soil_layer.raining = bool(raining)
+
+    if level.world:
+        level.world.restore(state.cells, state.plants, state.trees, player.rect.center)
+        return
+    level.soil_layer.restore(state.cells, state.plants)
+    for tree, (health, alive, apples) in zip(trees, state.trees):
+        tree.restore(health, alive, apples)
+
+def write(path, data):
+    # never leave a half written save behind
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def save(level, path):
+    write(path, encode(snapshot(level)))
+
+def load(level, path):
+    with open(path, 'rb') as file:
+        restore(level, decode(file.read()))
+
+class Autosaver:
+    def __init__(self, path):
+        # snapshots are taken on the main thread, encoding and writing happen on the worker
+        self.path = path
+        self.queue = queue.Queue()
+        self.timings = []
+        self.error = None
+        self.verbose = False
+        self.worker = threading.Thread(target = self.work, name = 'autosave', daemon = True)
+        self.worker.start()
+
+    def save(self, state, snapshot_time):
+        self.queue.put((state, snapshot_time))
+
+    def work(self):
+        closing = False
+        while not closing:
+            # only the newest snapshot is worth writing, None asks the worker to stop after it
+            job = None
+            for item in [self.queue.get()] + [self.queue.get() for _ in range(self.queue.qsize())]:
+                if item is None:
+                    closing = True
+                else:
+                    job = item
+            if job is None:
+                continue
+            state, snapshot_time = job
+            
+            # a failed save is reported and the next night tries again, the worker never dies with it
+            try:
+                start = perf_counter()
+                data = encode(state)
+                middle = perf_counter()
+                write(self.path, data)
+            except Exception as error:
+                self.error = error
+                print(self.report())
+                continue
+            self.error = None
+            self.timings.append((snapshot_time, middle - start, perf_counter() - middle, len(data)))
+            if self.verbose:
+                print(self.report())
+
+    def close(self):
+        # let the last save finish before the game exits
+        self.queue.put(None)
+        self.worker.join()
+
+    def report(self):
+        # the latest save
+        if self.error:
+            return f'autosave failed: {type(self.error).__name__}: {self.error}'
+        snapshot_time, encode_time, write_time, size = self.timings[-1]
+        return f'autosave: snapshot {snapshot_time * 1000:.2f} ms on the main thread, encode {encode_time * 1000:.2f} ms and write {write_time * 1000:.2f} ms on the worker, {size} bytes'
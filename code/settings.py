@@ -4,6 +4,55 @@ SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 TILE_SIZE = 64
 
+# simulation ticks per second, frames per second cap (0 for uncapped)
+TICK_RATE = 60
+FPS_CAP = 120
+MAX_FRAME_TIME = 0.25
+
+# static layers baked into chunk surfaces at load time, off until the draw benchmark shows a gain
+BAKE_STATIC_LAYERS = False
+STATIC_CHUNK_SIZE = 512
+
+# cell size of the camera's culling index
+CULL_CELL_SIZE = 256
+
+# map sprites and soil tiles streamed in chunks around the camera
+STREAM_WORLD = False
+WORLD_CHUNK_SIZE = 640
+STREAM_MARGIN = 128
+MAX_RESIDENT_CHUNKS = 16
+
+# frame order, sizes and hashes of everything under graphics/, written by python -m code.manifest
+MANIFEST_PATH = './graphics/manifest.json'
+
+# folders decoded in parallel before the level is built, the rest load when first used
+PRELOAD_ASSETS = ['graphics/character', 'graphics/fruit', 'graphics/overlay', 'graphics/rain', 'graphics/soil',
+                  'graphics/soil_water', 'graphics/stumps', 'graphics/water', 'graphics/world/ground.png']
+PRELOAD_SOUNDS = ['audio/axe.mp3', 'audio/hoe.wav', 'audio/music.mp3', 'audio/plant.wav', 'audio/success.wav', 'audio/water.mp3']
+
+# loading screen redraws per second while assets decode
+LOADING_FPS = 30
+
+# lights from the windows in the map's Lights layer and from house floors, composited into a light map over the chunks under the camera
+LIGHT_CHUNK_SIZE = 256
+LIGHT_SCALE = 1
+LIGHT_LEVELS = 16
+LIGHT_RINGS = 32
+LIGHT_COLOURS = {'window': (170, 120, 50), 'house': (190, 130, 60)}
+WINDOW_LIGHT_RADIUS = 160
+
+# hits a tree takes before it becomes a stump
+TREE_HEALTH = 5
+
+# autosave written every night
+SAVE_PATH = './data/save.sav'
+
+# transparent colour of the cached shop panels
+PANEL_COLORKEY = (255, 0, 255)
+
+# frames kept by the profiler overlay
+PROFILER_WINDOW = 240
+
 # overlay positions 
 OVERLAY_POSITIONS = {
 	'tool' : (60, SCREEN_HEIGHT - 30), 
@@ -39,6 +88,12 @@ APPLE_POS = {
 	'Large': [(30,24), (60,65), (50,50), (16,40),(45,50), (42,70)]
 }
 
+# rain particles spawned per second
+RAIN_RATE = {
+	'floor': 300,
+	'drops': 300
+}
+
 GROW_SPEED = {
 	'corn': 1,
 	'tomato': 0.7
@@ -1,82 +1,169 @@
 import pygame
 from .settings import *
 from .support import *
-from .sprites import Generic
-from .timer import Timer
-from random import randint, choice
+from .assets import assets
+from random import randint
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class Sky:
     def __init__(self):
         self.display_surface = pygame.display.get_surface()
         self.full_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.full_colour = None
         self.start_colour = [255, 255, 255]
-        self.colour = self.start_colour.copy()
         self.end_colour = (38, 101, 189)
         
-    def display(self, dt):
-        for index, value in enumerate(self.end_colour):
-            if self.colour[index] > value:
-                self.colour[index] -= 2 * dt
-        self.full_surf.fill(self.colour)
-        self.display_surface.blit(self.full_surf, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        # colour after each tick of the day, built once for the fixed tick and indexed by elapsed time
+        self.table = self.build_table(1 / TICK_RATE)
+        self.elapsed = 0
+        self.step = 0
+        self.colour = tuple(self.start_colour)
+        
+    def build_table(self, dt):
+        # the same steps update used to take every tick, with the colours truncated like fill does;
+        # each channel darkens on its own, so the channels are stepped separately and zipped
+        channels = []
+        for value, end in zip(self.start_colour, self.end_colour):
+            steps = [int(value)]
+            while value > end:
+                value -= 2 * dt
+                steps.append(int(value))
+            channels.append(steps)
+        length = max(len(steps) for steps in channels)
+        channels = [steps + [steps[-1]] * (length - len(steps)) for steps in channels]
+        return list(zip(*channels))
+        
+    def update(self, dt):
+        self.elapsed += dt
+        self.step = min(round(self.elapsed * TICK_RATE), len(self.table) - 1)
+        self.colour = self.table[self.step]
+        
+    def display(self, fade = 255):
+        # sky tint and sleep fade in one multiply over the screen, skipped while both are white
+        colour = self.colour
+        if fade != 255:
+            colour = tuple(value * fade // 255 for value in colour)
+        if colour == (255, 255, 255):
+            return
+        
+        # the integer colour only changes every few dozen ticks, so the surface is rarely refilled
+        if colour != self.full_colour:
+            self.full_surf.fill(colour)
+            self.full_colour = colour
+        self.display_surface.blit(self.full_surf, (0, 0), special_flags = pygame.BLEND_RGB_MULT)
         
     def reset(self):
-        self.colour = self.start_colour.copy()
+        self.elapsed = 0
+        self.step = 0
+        self.colour = tuple(self.start_colour)
 
-class Drops(Generic):
-    def __init__(self, pos, surf, groups, z, moving):
+class RainParticles:
+    def __init__(self, z, frames, rate, area, moving):
+        self.z = z
+        self.frames = frames
+        self.rate = rate
+        self.area = area
+        self.moving = moving
+        self.spawn_time = 0
         
-        # general setup
-        super().__init__(pos, surf, groups)
-        self.lifetime = randint(400, 500)
-        self.timer = Timer(self.lifetime, self.destroy)
-        self.timer.activate()
+        # preallocated pool, sized for the longest possible lifetime
+        self.size = int(rate * 0.5) + 8
+        self.free = list(range(self.size - 1, -1, -1))
+        if np:
+            self.x = np.zeros(self.size)
+            self.y = np.zeros(self.size)
+            self.age = np.zeros(self.size)
+            self.lifetime = np.zeros(self.size)
+            self.speed = np.zeros(self.size)
+            self.frame = np.zeros(self.size, dtype = np.int32)
+            self.active = np.zeros(self.size, dtype = bool)
+        else:
+            self.x = array('d', bytes(8 * self.size))
+            self.y = array('d', bytes(8 * self.size))
+            self.age = array('d', bytes(8 * self.size))
+            self.lifetime = array('d', bytes(8 * self.size))
+            self.speed = array('d', bytes(8 * self.size))
+            self.frame = array('i', bytes(4 * self.size))
+            self.active = bytearray(self.size)
         
-        # moving
-        self.moving = moving
-        if self.moving:
-            self.pos = pygame.math.Vector2(self.rect.topleft)
-            self.direction = pygame.math.Vector2(-2, 4)
-            self.speed = randint(200, 250)
+    def spawn(self):
+        if self.free:
+            index = self.free.pop()
+            self.x[index] = randint(0, self.area[0])
+            self.y[index] = randint(0, self.area[1])
+            self.age[index] = 0
+            self.lifetime[index] = randint(400, 500) / 1000
+            self.speed[index] = randint(200, 250) if self.moving else 0
+            self.frame[index] = randint(0, len(self.frames) - 1)
+            self.active[index] = True
+            
+    def update(self, dt, spawn):
         
-    def destroy(self):
-        self.kill()
-    
-    def animate(self, dt):
-        if self.moving:
-            self.pos += self.direction * self.speed * dt
-            self.rect.topleft = (round(self.pos.x), round(self.pos.y))
-    
-    def update(self, dt):
-        self.timer.update()
-        self.animate(dt)
-    
+        # age and move live drops
+        if np:
+            active = self.active
+            self.age[active] += dt
+            if self.moving:
+                self.x[active] -= 2 * self.speed[active] * dt
+                self.y[active] += 4 * self.speed[active] * dt
+            expired = np.flatnonzero(active & (self.age >= self.lifetime))
+            self.active[expired] = False
+            self.free.extend(expired.tolist())
+        else:
+            for index in range(self.size):
+                if self.active[index]:
+                    self.age[index] += dt
+                    if self.moving:
+                        self.x[index] -= 2 * self.speed[index] * dt
+                        self.y[index] += 4 * self.speed[index] * dt
+                    if self.age[index] >= self.lifetime[index]:
+                        self.active[index] = False
+                        self.free.append(index)
+        
+        # fixed number of new drops per second, whatever the frame rate
+        if spawn:
+            self.spawn_time += dt * self.rate
+            while self.spawn_time >= 1:
+                self.spawn_time -= 1
+                self.spawn()
+                
+    def draw(self, surface, offset, camera_rect):
+        frames = self.frames
+        left, top, right, bottom = camera_rect.left - TILE_SIZE, camera_rect.top - TILE_SIZE, camera_rect.right, camera_rect.bottom
+        if np:
+            x, y = np.round(self.x), np.round(self.y)
+            visible = np.flatnonzero(self.active & (x > left) & (x < right) & (y > top) & (y < bottom))
+            blits = [(frames[frame], (px - offset.x, py - offset.y)) for px, py, frame in zip(x[visible].tolist(), y[visible].tolist(), self.frame[visible].tolist())]
+        else:
+            blits = []
+            for index in range(self.size):
+                if self.active[index]:
+                    px, py = round(self.x[index]), round(self.y[index])
+                    if left < px < right and top < py < bottom:
+                        blits.append((frames[self.frame[index]], (px - offset.x, py - offset.y)))
+        surface.blits(blits, False)
+        
+    def __len__(self):
+        return self.size - len(self.free)
 
 class Rain:
     def __init__(self, all_sprites):
         self.all_sprites = all_sprites
-        self.rain_drops = import_folder('./graphics/rain/drops')
-        self.rain_floor = import_folder('./graphics/rain/floor')
-        self.floor_w, self.floor_h = pygame.image.load('./graphics/world/ground.png').get_size()
+        self.rain_drops = assets.frames('./graphics/rain/drops')
+        self.rain_floor = assets.frames('./graphics/rain/floor')
+        self.floor_w, self.floor_h = assets.image('./graphics/world/ground.png').get_size()
         
-    def create_floor(self):
-        Drops(
-            pos=(randint(0,self.floor_w),randint(0,self.floor_h)),
-            surf=choice(self.rain_floor),
-            groups=self.all_sprites,
-            z=LAYERS['rain floor'],
-            moving=False
-        )
-    
-    def create_drops(self):
-        Drops(
-            pos=(randint(0,self.floor_w),randint(0,self.floor_h)),
-            surf=choice(self.rain_drops),
-            groups=self.all_sprites,
-            z=LAYERS['rain drops'],
-            moving=True
-        )
+        # particles drawn by the camera on their own layers
+        self.floor = RainParticles(LAYERS['rain floor'], self.rain_floor, RAIN_RATE['floor'], (self.floor_w, self.floor_h), moving = False)
+        self.drops = RainParticles(LAYERS['rain drops'], self.rain_drops, RAIN_RATE['drops'], (self.floor_w, self.floor_h), moving = True)
+        self.all_sprites.add_renderer(self.floor)
+        self.all_sprites.add_renderer(self.drops)
         
-    def update(self, dt):
-        self.create_floor()
-        self.create_drops()
\ No newline at end of file
+    def update(self, dt, raining = True):
+        self.floor.update(dt, raining)
+        self.drops.update(dt, raining)
@@ -2,7 +2,13 @@ import pygame
 from .settings import *
 from .support import *
 from random import choice
-from pytmx.util_pygame import load_pygame
+from array import array
+from .assets import assets
+from .grid import SoilGrid, FARMABLE, HOED, WATERED, PLANTED, np
+from .spatial import SpatialHash
+
+# soil tile for each neighbour mask: left 1, right 2, top 4, bottom 8
+TILE_KEYS = ['o', 'r', 'l', 'lr', 'b', 'br', 'bl', 'bm', 't', 'tr', 'tl', 'tm', 'tb', 'rm', 'lm', 'x']
 
 class SoilTile(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups):
@@ -18,42 +24,120 @@ class WaterTile(pygame.sprite.Sprite):
         self.rect = self.image.get_rect(topleft=pos)
         self.z = LAYERS['soil water']
 
+class PlantColumns:
+    # growth state of every plant, one array per field, so a night of growth is one batched step
+    def __init__(self, grid):
+        self.grid = grid
+        self.plants = []
+        self.cells = array('q')
+        self.ages = array('d')
+        self.speeds = array('d')
+        self.max_ages = array('d')
+        
+        # harvestable plants by the cells their rect covers
+        self.ripe = SpatialHash(TILE_SIZE)
+        
+    def add(self, plant, cell, speed, max_age):
+        plant.index = len(self.plants)
+        self.plants.append(plant)
+        self.cells.append(cell[1] * self.grid.width + cell[0])
+        self.ages.append(0)
+        self.speeds.append(speed)
+        self.max_ages.append(max_age)
+        
+    def remove(self, plant):
+        # the last plant takes the freed slot
+        index = plant.index
+        last = self.plants.pop()
+        for column in (self.cells, self.ages, self.speeds, self.max_ages):
+            value = column.pop()
+            if last is not plant:
+                column[index] = value
+        if last is not plant:
+            self.plants[index] = last
+            last.index = index
+        plant.index = None
+        self.ripe.remove(plant)
+        
+    def grow(self):
+        # watered plants age by their speed; returns the plants whose sprite has to follow
+        if not self.plants:
+            return []
+        if np:
+            cells = np.frombuffer(self.cells, dtype = np.int64)
+            ages = np.frombuffer(self.ages, dtype = np.float64)
+            max_ages = np.frombuffer(self.max_ages, dtype = np.float64)
+            watered = (self.grid.array.reshape(-1)[cells] & WATERED) != 0
+            frames = ages.astype(np.int64)
+            ages[watered] = np.minimum(ages[watered] + np.frombuffer(self.speeds, dtype = np.float64)[watered], max_ages[watered])
+            changed = np.nonzero(watered & ((ages.astype(np.int64) != frames) | (ages >= max_ages)))[0].tolist()
+            del cells, ages, max_ages
+        else:
+            grid_cells, ages, speeds, max_ages = self.grid.cells, self.ages, self.speeds, self.max_ages
+            changed = []
+            for index, cell in enumerate(self.cells):
+                if grid_cells[cell] & WATERED:
+                    frame = int(ages[index])
+                    ages[index] = min(ages[index] + speeds[index], max_ages[index])
+                    if int(ages[index]) != frame or ages[index] >= max_ages[index]:
+                        changed.append(index)
+        plants = [self.plants[index] for index in changed]
+        for plant in plants:
+            plant.refresh()
+        return plants
+
 class Plant(pygame.sprite.Sprite):
-    def __init__(self, plant_type, groups, soil, check_watered):
+    def __init__(self, plant_type, groups, soil, columns):
         super().__init__(groups)
         
         # setup
         self.plant_type = plant_type
-        self.frames = import_folder(f'./graphics/fruit/{self.plant_type}')
+        self.frames = assets.animations('./graphics/fruit')[self.plant_type]
         self.soil = soil
         
-        # plant growth
-        self.age = 0
+        # plant growth, the age lives in the shared columns
+        self.columns = columns
+        columns.add(self, (soil.rect.x // TILE_SIZE, soil.rect.y // TILE_SIZE), GROW_SPEED[plant_type], len(self.frames) - 1)
         self.max_age = len(self.frames) - 1
-        self.grow_speed = GROW_SPEED[self.plant_type]
         self.harvestable = False
         
         # sprite setup
-        self.image = self.frames[self.age]
+        self.image = self.frames[0]
         self.y_offset = -16 if plant_type == 'corn' else -8
         self.rect = self.image.get_rect(midbottom=self.soil.rect.midbottom + pygame.math.Vector2(0, self.y_offset))
         self.z = LAYERS['ground plant']
-        self.check_watered = check_watered
         
-    def grow(self):
-        if self.check_watered(self.rect.center):
-            self.age += self.grow_speed
-            
-            if int(self.age) > 0:
-                self.z = LAYERS['main']
-                
-            if self.age >= self.max_age:
-                self.age = self.max_age
-                self.harvestable = True
-                self.hitbox = self.rect.copy().inflate(-26, -self.rect.height * 0.4)
+    @property
+    def age(self):
+        return self.columns.ages[self.index]
+    
+    @age.setter
+    def age(self, age):
+        self.columns.ages[self.index] = age
+        
+    def kill(self):
+        super().kill()
+        if self.index is not None:
+            self.columns.remove(self)
+        
+    def set_age(self, age):
+        self.age = min(age, self.max_age)
+        self.refresh()
+        
+    def refresh(self):
+        # bring the sprite in line with the age
+        if int(self.age) > 0:
+            self.z = LAYERS['main']
             
-            self.image = self.frames[int(self.age)]
-            self.rect = self.image.get_rect(midbottom=self.soil.rect.midbottom + pygame.math.Vector2(0, self.y_offset))
+        if self.age >= self.max_age:
+            self.harvestable = True
+            self.hitbox = self.rect.copy().inflate(-26, -self.rect.height * 0.4)
+        
+        self.image = self.frames[int(self.age)]
+        self.rect = self.image.get_rect(midbottom=self.soil.rect.midbottom + pygame.math.Vector2(0, self.y_offset))
+        moved(self)
+        if self.harvestable:
+            self.columns.ripe.insert(self, self.rect)
 
 class SoilLayer:
     def __init__(self, all_sprites, collision_sprites, raining):
@@ -64,165 +148,185 @@ class SoilLayer:
         self.soil_sprites = pygame.sprite.Group()
         self.water_sprites = pygame.sprite.Group()
         self.plant_sprites = pygame.sprite.Group()
+        self.soil_tiles = {}
+        self.water_tiles = {}
+        
+        # cells outside this test keep their grid state but have no sprites, None means the whole map has them
+        self.is_loaded = None
         
         # graphics
-        self.soil_surfs = import_folder_dict('./graphics/soil')
-        self.water_surfs = import_folder('./graphics/soil_water')
+        self.soil_surfs = assets.folder_dict('./graphics/soil')
+        self.water_surfs = assets.frames('./graphics/soil_water')
         
         # setup
         self.raining = raining
         self.create_soil_grid()
-        self.create_hit_rects()
+        self.plant_columns = PlantColumns(self.grid)
         
         # audio
-        self.hoe_sound = pygame.mixer.Sound('./audio/hoe.wav')
+        self.hoe_sound = assets.sound('./audio/hoe.wav')
         self.hoe_sound.set_volume(0.3)
         
-        self.plant_sound = pygame.mixer.Sound('./audio/plant.wav')
+        self.plant_sound = assets.sound('./audio/plant.wav')
         self.plant_sound.set_volume(0.2)
         
     def create_soil_grid(self):
-        ground = pygame.image.load('./graphics/world/ground.png')
+        ground = assets.image('./graphics/world/ground.png')
         h_tiles, v_tiles = ground.get_width() // TILE_SIZE, ground.get_height() // TILE_SIZE
         
-        self.grid = [ [[] for col in range(h_tiles)] for row in range(v_tiles) ]
-        for x, y, _ in load_pygame('./data/map.tmx').get_layer_by_name('Farmable').tiles():
-            self.grid[y][x].append('F')
-        
-    def create_hit_rects(self):
-        self.hit_rects = []
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'F' in cell:
-                    x = index_col * TILE_SIZE
-                    y = index_row * TILE_SIZE
-                    rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-                    self.hit_rects.append(rect)
+        self.grid = SoilGrid(h_tiles, v_tiles)
+        for x, y, _ in assets.map('./data/map.tmx').get_layer_by_name('Farmable').tiles():
+            self.grid.set(x, y, FARMABLE)
+        
+    def get_cell(self, point):
+        # truncate like Rect.collidepoint did, then index the grid directly
+        x = int(point[0]) // TILE_SIZE
+        y = int(point[1]) // TILE_SIZE
+        return (x, y) if self.grid.inside(x, y) else None
+    
+    def loaded(self, x, y):
+        return self.is_loaded is None or self.is_loaded(x, y)
                     
     def get_hit(self, point):
-        for rect in self.hit_rects:
-            if rect.collidepoint(point):
-                x = rect.x // TILE_SIZE
-                y = rect.y // TILE_SIZE
+        cell = self.get_cell(point)
+        if cell and self.grid.has(*cell, FARMABLE):
+            x, y = cell
+            if not self.grid.has(x, y, HOED):
+                self.grid.set(x, y, HOED)
+                self.update_soil_tiles(x, y)
+            if self.raining:
+                self.water(point)
+                
+            self.hoe_sound.play()
+                    
+    def get_tile_key(self, index_row, index_col):
+        return TILE_KEYS[self.grid.neighbours(index_col, index_row, HOED)]
+    
+    def update_soil_tile(self, index_row, index_col):
+        if self.grid.has(index_col, index_row, HOED) and self.loaded(index_col, index_row):
+            surf = self.soil_surfs[self.get_tile_key(index_row, index_col)]
+            tile = self.soil_tiles.get((index_col, index_row))
+            if tile:
+                tile.image = surf
+            else:
+                x = index_col * TILE_SIZE
+                y = index_row * TILE_SIZE
+                self.soil_tiles[(index_col, index_row)] = SoilTile((x,y), surf, [self.all_sprites, self.soil_sprites])
                 
-                if 'F' in self.grid[y][x]:
-                    self.grid[y][x].append('X')
-                    self.create_soil_tiles()
-                    if self.raining:
-                        self.water(point)
-                        
-                    self.hoe_sound.play()
+    def update_soil_tiles(self, x, y):
+        
+        # only the hit cell and its neighbours can change shape
+        for col, row in ((x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if self.grid.inside(col, row):
+                self.update_soil_tile(row, col)
 
     def create_soil_tiles(self):
-        self.soil_sprites.empty()
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'X' in cell:
-                    
-                    # tile options
-                    left = False if index_col == 0 else 'X' in self.grid[index_row][index_col - 1]
-                    right = False if index_col == len(self.grid[index_row]) - 1 else 'X' in self.grid[index_row][index_col + 1]
-                    top = False if index_col == 0 else 'X' in self.grid[index_row - 1][index_col]
-                    bottom = False if index_col == len(self.grid) - 1 else 'X' in self.grid[index_row + 1][index_col]
-                    
-                    tile_key = 'o'
-                    
-                    if (left and right and bottom and top):
-                        tile_key = 'x'
-                    elif (left and right and bottom):
-                        tile_key = 'tm'
-                    elif (left and right and top):
-                        tile_key = 'bm'
-                    elif (left and top and bottom):
-                        tile_key = 'rm'
-                    elif (right and top and bottom):
-                        tile_key = 'lm'
-                    elif (left and right):
-                        tile_key = 'lr'
-                    elif (left and top):
-                        tile_key = 'br'
-                    elif (left and bottom):
-                        tile_key = 'tr'
-                    elif (right and top):
-                        tile_key = 'bl'
-                    elif (right and bottom):
-                        tile_key = 'tl'
-                    elif (top and bottom):
-                        tile_key = 'tb'
-                    elif left:
-                        tile_key = 'r'
-                    elif right:
-                        tile_key = 'l'
-                    elif top:
-                        tile_key = 'b'
-                    elif bottom:
-                        tile_key = 't'
-                    
-                    x = index_col * TILE_SIZE
-                    y = index_row * TILE_SIZE
-                    SoilTile((x,y), self.soil_surfs[tile_key], [self.all_sprites, self.soil_sprites])
+        for tile in self.soil_tiles.values():
+            tile.kill()
+        self.soil_tiles.clear()
+        for index_col, index_row, neighbours in self.grid.neighbour_masks(HOED):
+            if not self.loaded(index_col, index_row):
+                continue
+            x = index_col * TILE_SIZE
+            y = index_row * TILE_SIZE
+            surf = self.soil_surfs[TILE_KEYS[neighbours]]
+            self.soil_tiles[(index_col, index_row)] = SoilTile((x,y), surf, [self.all_sprites, self.soil_sprites])
                     
     def water(self, point):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(point):
-                
-                # add an entry to the soil grid
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                if 'W' not in self.grid[y][x]:
-                    self.grid[y][x].append('W')
-                    
-                    # create water sprite
-                    pos = soil_sprite.rect.topleft
-                    surf = choice(self.water_surfs)
-                    WaterTile(pos, surf, [self.all_sprites, self.water_sprites])
+        cell = self.get_cell(point)
+        soil_sprite = self.soil_tiles.get(cell)
+        if soil_sprite and not self.grid.has(*cell, WATERED):
+            
+            # add an entry to the soil grid
+            self.grid.set(*cell, WATERED)
+            
+            # create water sprite
+            self.add_water_tile(*cell)
     
     def water_all(self):
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'X' in cell and not 'W' in cell:
-                    # add an entry to the soil grid
-                    self.grid[index_row][index_col].append('W')
-                    
-                    # create water sprite
-                    pos = (index_col * TILE_SIZE, index_row * TILE_SIZE)
-                    surf = choice(self.water_surfs)
-                    WaterTile(pos, surf, [self.all_sprites, self.water_sprites])
+        dry = self.grid.find(HOED | WATERED, HOED)
+        self.grid.set_where(HOED | WATERED, HOED, WATERED)
+        
+        # create water sprites
+        for index_col, index_row in dry:
+            self.add_water_tile(index_col, index_row)
+    
+    def add_water_tile(self, x, y):
+        if self.loaded(x, y):
+            pos = (x * TILE_SIZE, y * TILE_SIZE)
+            surf = choice(self.water_surfs)
+            self.water_tiles[(x, y)] = WaterTile(pos, surf, [self.all_sprites, self.water_sprites])
     
     def remove_water(self):
         
         # remove all sprites
         for water in self.water_sprites:
             water.kill()
+        self.water_tiles.clear()
         
         # remove from grid
-        for row in self.grid:
-            for cell in row:
-                if 'W' in cell:
-                    cell.remove('W')
-    
-    def check_watered(self, point):
-        x = point[0] // TILE_SIZE
-        y = point[1] // TILE_SIZE
-        cell = self.grid[y][x]
-        is_watered = 'W' in cell
-        return is_watered 
+        self.grid.clear_all(WATERED)
     
     def plant_seed(self, point, seed):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(point):
-                
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                if 'P' not in self.grid[y][x]:
-                    self.grid[y][x].append('P')
-
-                    Plant(seed, [self.all_sprites, self.plant_sprites, self.collision_sprites], soil_sprite, self.check_watered)
-                    
-                    self.plant_sound.play()
-                    return True
+        cell = self.get_cell(point)
+        soil_sprite = self.soil_tiles.get(cell)
+        if soil_sprite and not self.grid.has(*cell, PLANTED):
+            self.grid.set(*cell, PLANTED)
+            
+            Plant(seed, [self.all_sprites, self.plant_sprites, self.collision_sprites], soil_sprite, self.plant_columns)
+            
+            self.plant_sound.play()
+            return True
         return False
     
-    def update_plants(self):
+    def restore(self, cells, plants):
+        # replace the whole farm with a saved grid and its (col, row, type, age) plants
+        for sprite in self.water_sprites.sprites() + self.plant_sprites.sprites():
+            sprite.kill()
+        self.water_tiles.clear()
+        self.grid.cells[:] = cells
+        self.create_soil_tiles()
+        for index_col, index_row in self.grid.find(HOED | WATERED, HOED | WATERED):
+            self.add_water_tile(index_col, index_row)
+        for plant in plants:
+            self.add_plant(*plant)
+    
+    def add_plant(self, index_col, index_row, plant_type, age):
+        plant = Plant(plant_type, [self.all_sprites, self.plant_sprites, self.collision_sprites], self.soil_tiles[(index_col, index_row)], self.plant_columns)
+        plant.set_age(age)
+    
+    def plant_states(self):
+        return [(plant.soil.rect.x // TILE_SIZE, plant.soil.rect.y // TILE_SIZE, plant.plant_type, plant.age)
+                for plant in self.plant_sprites]
+    
+    def load_area(self, area, plants):
+        # sprites for a rect of cells, from the grid and the (col, row, type, age) plants stored when it was unloaded
+        grid = self.grid
+        for index_row in range(max(area.top, 0), min(area.bottom, grid.height)):
+            for index_col in range(max(area.left, 0), min(area.right, grid.width)):
+                if grid.has(index_col, index_row, HOED):
+                    self.update_soil_tile(index_row, index_col)
+                    if grid.has(index_col, index_row, WATERED):
+                        self.add_water_tile(index_col, index_row)
+        for plant in plants:
+            self.add_plant(*plant)
+    
+    def unload_area(self, area):
+        # the grid keeps the soil, only the plants need storing
+        for tiles in (self.soil_tiles, self.water_tiles):
+            for cell in [cell for cell in tiles if area.collidepoint(cell)]:
+                tiles.pop(cell).kill()
+        plants = []
         for plant in self.plant_sprites.sprites():
-            plant.grow()
\ No newline at end of file
+            cell = (plant.soil.rect.x // TILE_SIZE, plant.soil.rect.y // TILE_SIZE)
+            if area.collidepoint(cell):
+                plants.append((*cell, plant.plant_type, plant.age))
+                plant.kill()
+        return plants
+        
+    def update_plants(self):
+        for plant in self.plant_columns.grow():
+            
+            # ripe plants gain a hitbox
+            if plant.harvestable:
+                self.collision_sprites.reindex(plant)
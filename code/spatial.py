@@ -0,0 +1,55 @@
+from .settings import *
+
+class SpatialHash:
+    def __init__(self, cell_size = TILE_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+
+    def cell_bounds(self, rect):
+        size = self.cell_size
+        left = rect.left // size
+        top = rect.top // size
+        right = max(rect.left, rect.right - 1) // size
+        bottom = max(rect.top, rect.bottom - 1) // size
+        return left, top, right, bottom
+
+    def insert(self, item, rect):
+        if item in self.entries:
+            self.remove(item)
+        bounds = self.cell_bounds(rect)
+        self.entries[item] = bounds
+        left, top, right, bottom = bounds
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                self.cells.setdefault((col, row), set()).add(item)
+
+    def remove(self, item):
+        bounds = self.entries.pop(item, None)
+        if bounds:
+            left, top, right, bottom = bounds
+            for row in range(top, bottom + 1):
+                for col in range(left, right + 1):
+                    cell = self.cells[(col, row)]
+                    cell.discard(item)
+                    if not cell:
+                        del self.cells[(col, row)]
+
+    def query_bounds(self, bounds):
+        left, top, right, bottom = bounds
+        found = set()
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                cell = self.cells.get((col, row))
+                if cell:
+                    found |= cell
+        return found
+
+    def query(self, rect):
+        return self.query_bounds(self.cell_bounds(rect))
+
+    def __contains__(self, item):
+        return item in self.entries
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,6 +1,8 @@
 import pygame
 from .settings import *
-from .timer import Timer
+from .timer import Timer, game_scheduler
+from .assets import assets
+from .support import moved
 from random import randint, choice
 
 class Generic(pygame.sprite.Sprite):
@@ -51,10 +53,8 @@ class Water(Generic):
     
     def animate(self, dt):
         
-        # update frame
-        self.frame_index += 5 * dt
-        if self.frame_index >= len(self.frames):
-            self.frame_index = 0
+        # update frame from game time, so tiles streamed in later stay in step
+        self.frame_index = game_scheduler.get_ticks() * 0.005 % len(self.frames)
         
         # update sprite
         self.image = self.frames[int(self.frame_index)]
@@ -77,13 +77,14 @@ class Tree(Generic):
         self.camera_group = camera_group
         
         # tree attributes
-        self.health = 5
+        self.health = TREE_HEALTH
         self.alive = True
+        self.tree_surf = surf
         stump_path = f'./graphics/stumps/{"small" if name == "Small" else "large"}.png'
-        self.stump_surf = pygame.image.load(stump_path).convert_alpha()
+        self.stump_surf = assets.image(stump_path)
         
         # apples
-        self.apples_surf = pygame.image.load('./graphics/fruit/apple.png')
+        self.apples_surf = assets.image('./graphics/fruit/apple.png')
         self.apple_pos = APPLE_POS[name]
         self.apple_sprites = pygame.sprite.Group()
         self.create_fruit()
@@ -92,7 +93,7 @@ class Tree(Generic):
         self.player_add = player_add
         
         # sounds
-        self.axe_sound = pygame.mixer.Sound('./audio/axe.mp3')
+        self.axe_sound = assets.sound('./audio/axe.mp3')
         
     def create_fruit(self):
         for pos in self.apple_pos:
@@ -107,6 +108,32 @@ class Tree(Generic):
     def destroy_fruit(self):
         for apple in self.apple_sprites.sprites():
             apple.kill()
+            
+    def kill(self):
+        # apples are only in the camera group, so they go with the tree
+        self.destroy_fruit()
+        super().kill()
+            
+    def save_state(self):
+        return (self.health, self.alive, [(apple.rect.x - self.rect.x, apple.rect.y - self.rect.y) for apple in self.apple_sprites])
+            
+    def restore(self, health, alive, apples):
+        # apples are offsets from the top left of the tree, or of its stump; None grows a fresh set
+        self.health = health
+        if alive != self.alive:
+            self.alive = alive
+            self.image = self.tree_surf if alive else self.stump_surf
+            self.rect = self.image.get_rect(midbottom = self.rect.midbottom)
+            moved(self)
+        self.destroy_fruit()
+        if apples is None:
+            self.create_fruit()
+            return
+        for x, y in apples:
+            Generic(pos=(self.rect.left + x, self.rect.top + y),
+                    surf=self.apples_surf,
+                    groups=[self.apple_sprites, self.camera_group],
+                    z=LAYERS['fruit'])
     
     def damage(self):
         
@@ -135,6 +162,7 @@ class Tree(Generic):
             # display stump
             self.image = self.stump_surf
             self.rect = self.image.get_rect(midbottom = self.rect.midbottom)
+            moved(self)
             # self.hitbox = self.rect.copy().inflate(0, -self.rect.height * 0.4)
             # self.hitbox.bottom = self.rect.bottom
             
@@ -160,9 +188,6 @@ class Particle(Generic):
         
     def remove_particle(self):
         self.kill()
-    
-    def update(self, dt):
-        self.timer.update()
         
 class Interaction(Generic):
     def __init__(self, pos, size, groups, name):
@@ -1,11 +1,22 @@
 from os import walk
 import pygame
 
+def frame_key(name):
+    # numbered frames in numeric order, anything else after them by name
+    stem = name.split('.')[0]
+    return (0, int(stem), name) if stem.isdigit() else (1, 0, name)
+
+def moved(sprite):
+    # groups that cache positions only revisit sprites that report a new rect or z
+    for group in sprite.groups():
+        if hasattr(group, 'moved'):
+            group.moved(sprite)
+
 def import_folder(path):
     surface_list = []
     
     for _, __, img_files in walk(path):
-        for image in img_files:
+        for image in sorted(img_files, key = frame_key):
             full_path = path + '/' + image
             image_surf = pygame.image.load(full_path).convert_alpha()
             surface_list.append(image_surf)
@@ -16,7 +27,7 @@ def import_folder_dict(path):
     surface_dict = {}
     
     for _, __, img_files in walk(path):
-        for image in img_files:
+        for image in sorted(img_files, key = frame_key):
             full_path = path + '/' + image
             image_surf = pygame.image.load(full_path).convert_alpha()
             surface_dict.update({image.split('.')[0]: image_surf})
@@ -1,23 +1,72 @@
-import pygame
+from heapq import heappush, heappop
+from itertools import count
+
+class Scheduler:
+    def __init__(self):
+
+        # milliseconds of simulated time, advanced once per simulation tick
+        self.ticks = 0
+
+        # (deadline, activation, timer); entries for deactivated or restarted timers are skipped when popped
+        self.queue = []
+        self.activations = count()
+
+    def advance(self, dt):
+        self.ticks += dt * 1000
+
+    def get_ticks(self):
+        return self.ticks
+
+    def schedule(self, timer):
+        timer.activation = next(self.activations)
+        heappush(self.queue, (timer.start_time + timer.duration, timer.activation, timer))
+
+    def run(self):
+        # only timers whose deadline has passed are touched
+        queue = self.queue
+        while queue:
+            _, activation, timer = queue[0]
+            if not timer.active or timer.activation != activation:
+                heappop(queue)
+            elif self.ticks - timer.start_time >= timer.duration:
+                heappop(queue)
+                timer.expire()
+            else:
+                break
+
+    def reset(self):
+        self.ticks = 0
+        self.queue.clear()
+
+# game timers stop while the shop is open, ui timers keep running
+game_scheduler = Scheduler()
+ui_scheduler = Scheduler()
 
 class Timer:
-    def __init__(self, duration, func = None):
+    def __init__(self, duration, func = None, scheduler = None):
         self.duration = duration
         self.func = func
+        self.scheduler = scheduler or game_scheduler
         self.start_time = 0
         self.active = False
-        
+        self.activation = None
+
     def activate(self):
         self.active = True
-        self.start_time = pygame.time.get_ticks()
-    
+        self.start_time = self.scheduler.get_ticks()
+        self.scheduler.schedule(self)
+
     def deactivate(self):
         self.active = False
         self.start_time = 0
-    
+
+    def expire(self):
+        if self.func:
+            self.func()
+        self.deactivate()
+
     def update(self):
-        current_time = pygame.time.get_ticks()
+        # the scheduler runs expired timers itself; this only fires one early if its deadline has passed
+        current_time = self.scheduler.get_ticks()
         if self.active and current_time - self.start_time >= self.duration:
-            if self.func:
-                self.func()
-            self.deactivate()
\ No newline at end of file
+            self.expire()
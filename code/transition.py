@@ -14,16 +14,18 @@ class Transition():
         self.colour = 255
         self.speed = -2
         
-    def play(self):
+    def update(self):
         self.colour += self.speed
         if self.colour < 0:
             self.colour = 0
             self.speed *= -1
             self.reset()
+        if self.colour >= 255:
+            self.player.sleep = False
+            self.speed = -2
+            self.colour = 255
+            
+    def display(self):
         if self.colour < 255:
             self.image.fill((self.colour, self.colour, self.colour))
             self.display_surface.blit(self.image, (0,0), special_flags=pygame.BLEND_RGB_MULT)
-        else:
-            self.player.sleep = False
-            self.speed = -2
-            self.colour = 255
\ No newline at end of file
@@ -0,0 +1,146 @@
+import pygame
+from collections import OrderedDict
+from time import perf_counter
+from .settings import *
+from .sprites import Tree
+from .grid import WATERED
+from .assets import assets
+
+class ChunkStreamer:
+    def __init__(self, soil_layer, chunk_size = WORLD_CHUNK_SIZE, margin = STREAM_MARGIN, max_resident = MAX_RESIDENT_CHUNKS):
+        self.soil_layer = soil_layer
+        self.chunk_size = chunk_size
+        self.chunk_cells = chunk_size // TILE_SIZE
+        self.margin = margin
+        self.max_resident = max_resident
+        soil_layer.is_loaded = self.loaded
+
+        # what setup asked for, per chunk: (entry, factory, pos, args, kwargs)
+        self.spawns = {}
+        self.entries = 0
+        self.trees = []
+
+        # resident chunks, least recently wanted first, each with its sprites by entry
+        self.resident = OrderedDict()
+        self.bounds = None
+
+        # what evicted chunks leave behind: (day, state) per tree entry, (col, row, type, age) plants per chunk
+        self.states = {}
+        self.plants = {}
+        self.day = 0
+
+        # seconds per load and per eviction
+        self.load_times = []
+        self.evict_times = []
+
+    def chunk(self, pos):
+        return (int(pos[0]) // self.chunk_size, int(pos[1]) // self.chunk_size)
+
+    def cell_area(self, key):
+        cells = self.chunk_cells
+        return pygame.Rect(key[0] * cells, key[1] * cells, cells, cells)
+
+    def loaded(self, x, y):
+        cells = self.chunk_cells
+        return (x // cells, y // cells) in self.resident
+
+    def add(self, factory, pos, *args, **kwargs):
+        key = self.chunk(pos)
+        self.spawns.setdefault(key, []).append((self.entries, factory, pos, args, kwargs))
+        if factory is Tree:
+            self.trees.append((self.entries, key))
+        self.entries += 1
+
+    def update(self, center):
+        # every chunk under the screen plus a margin, so sprites are in before they show
+        area = pygame.Rect(0, 0, SCREEN_WIDTH + 2 * self.margin, SCREEN_HEIGHT + 2 * self.margin)
+        area.center = center
+        left, top = self.chunk(area.topleft)
+        right, bottom = self.chunk((area.right - 1, area.bottom - 1))
+        if (left, top, right, bottom) == self.bounds:
+            return
+        self.bounds = (left, top, right, bottom)
+
+        wanted = [(col, row) for row in range(top, bottom + 1) for col in range(left, right + 1)]
+        for key in wanted:
+            if key in self.resident:
+                self.resident.move_to_end(key)
+            else:
+                self.load(key)
+
+        # past the limit the least recently wanted chunks go
+        excess = len(self.resident) - self.max_resident
+        if excess > 0:
+            for key in [key for key in self.resident if key not in wanted][:excess]:
+                self.evict(key)
+
+    def load(self, key):
+        start = perf_counter()
+        sprites = self.resident[key] = {}
+        for entry, factory, pos, args, kwargs in self.spawns.get(key, ()):
+            sprite = sprites[entry] = factory(pos, *args, **kwargs)
+            if entry in self.states:
+                day, (health, alive, apples) = self.states.pop(entry)
+                sprite.restore(health, alive, apples if day == self.day else None)
+        self.soil_layer.load_area(self.cell_area(key), self.plants.pop(key, ()))
+        self.load_times.append(perf_counter() - start)
+
+    def evict(self, key):
+        start = perf_counter()
+        for entry, sprite in self.resident.pop(key).items():
+            if isinstance(sprite, Tree):
+                self.states[entry] = (self.day, sprite.save_state())
+            sprite.kill()
+        plants = self.soil_layer.unload_area(self.cell_area(key))
+        if plants:
+            self.plants[key] = plants
+        self.evict_times.append(perf_counter() - start)
+
+    def new_day(self):
+        # plants in evicted chunks grow the way update_plants grows the resident ones; apples regrow on load
+        self.day += 1
+        grid = self.soil_layer.grid
+        fruit = assets.animations('./graphics/fruit')
+        for plants in self.plants.values():
+            for index, (x, y, plant_type, age) in enumerate(plants):
+                if grid.has(x, y, WATERED):
+                    plants[index] = (x, y, plant_type, min(age + GROW_SPEED[plant_type], len(fruit[plant_type]) - 1))
+
+    def tree_states(self):
+        # every tree in setup order, the ones never visited as the map made them
+        states = []
+        for entry, key in self.trees:
+            sprite = self.resident.get(key, {}).get(entry)
+            if sprite:
+                states.append(sprite.save_state())
+            elif entry in self.states:
+                day, (health, alive, apples) = self.states[entry]
+                states.append((health, alive, apples if day == self.day else None))
+            else:
+                states.append((TREE_HEALTH, True, None))
+        return states
+
+    def plant_states(self):
+        plants = self.soil_layer.plant_states()
+        for stored in self.plants.values():
+            plants.extend(stored)
+        return plants
+
+    def restore(self, cells, plants, trees, center):
+        # drop everything resident, then stream back in from the saved state
+        for key in list(self.resident):
+            self.evict(key)
+        self.states = {entry: (self.day, state) for (entry, _), state in zip(self.trees, trees)}
+        self.plants = {}
+        for plant in plants:
+            self.plants.setdefault(self.chunk((plant[0] * TILE_SIZE, plant[1] * TILE_SIZE)), []).append(plant)
+        self.soil_layer.grid.cells[:] = cells
+        self.bounds = None
+        self.update(center)
+
+    def report(self):
+        loads = sorted(self.load_times) or [0]
+        evictions = sorted(self.evict_times) or [0]
+        return (f'stream: {len(self.resident)} chunks resident (limit {self.max_resident}), {len(self.load_times)} loads, {len(self.evict_times)} evictions, '
+                f'load p50 {loads[len(loads) // 2] * 1000:.2f} ms p95 {loads[int(len(loads) * 0.95)] * 1000:.2f} ms max {loads[-1] * 1000:.2f} ms, '
+                f'evict max {evictions[-1] * 1000:.2f} ms')
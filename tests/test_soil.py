@@ -0,0 +1,204 @@
+import os, sys, unittest
+from random import Random
+
+# no window or sound card needed
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from code.settings import *
+from code.grid import FARMABLE
+from code.soil import SoilLayer
+from code.level import CameraGroup, CollisionGroup
+
+class LegacySoil:
+    # SoilLayer's tools on the old lists of flags, with the sprites reduced to their cells
+    def __init__(self, width, height, farmable):
+        self.grid = [[[] for col in range(width)] for row in range(height)]
+        for x, y in farmable:
+            self.grid[y][x].append('F')
+        self.hit_rects = [pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE) for x, y in farmable]
+        self.soil_tiles = {}
+        self.water_cells = set()
+        self.plant_cells = set()
+        self.raining = False
+
+    def get_hit(self, point):
+        for rect in self.hit_rects:
+            if rect.collidepoint(point):
+                x = rect.x // TILE_SIZE
+                y = rect.y // TILE_SIZE
+                if 'F' in self.grid[y][x]:
+                    self.grid[y][x].append('X')
+                    self.create_soil_tiles()
+                    if self.raining:
+                        self.water(point)
+
+    def create_soil_tiles(self):
+        self.soil_tiles = {}
+        for index_row, row in enumerate(self.grid):
+            for index_col, cell in enumerate(row):
+                if 'X' in cell:
+                    left = index_col > 0 and 'X' in row[index_col - 1]
+                    right = index_col < len(row) - 1 and 'X' in row[index_col + 1]
+                    top = index_row > 0 and 'X' in self.grid[index_row - 1][index_col]
+                    bottom = index_row < len(self.grid) - 1 and 'X' in self.grid[index_row + 1][index_col]
+                    self.soil_tiles[(index_col, index_row)] = self.tile_key(left, right, top, bottom)
+
+    def tile_key(self, left, right, top, bottom):
+        if left and right and bottom and top: return 'x'
+        if left and right and bottom: return 'tm'
+        if left and right and top: return 'bm'
+        if left and top and bottom: return 'rm'
+        if right and top and bottom: return 'lm'
+        if left and right: return 'lr'
+        if left and top: return 'br'
+        if left and bottom: return 'tr'
+        if right and top: return 'bl'
+        if right and bottom: return 'tl'
+        if top and bottom: return 'tb'
+        if left: return 'r'
+        if right: return 'l'
+        if top: return 'b'
+        if bottom: return 't'
+        return 'o'
+
+    def soil_cell(self, point):
+        for x, y in self.soil_tiles:
+            if pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE).collidepoint(point):
+                return x, y
+
+    def water(self, point):
+        cell = self.soil_cell(point)
+        if cell and 'W' not in self.grid[cell[1]][cell[0]]:
+            self.grid[cell[1]][cell[0]].append('W')
+            self.water_cells.add(cell)
+
+    def water_all(self):
+        for index_row, row in enumerate(self.grid):
+            for index_col, cell in enumerate(row):
+                if 'X' in cell and not 'W' in cell:
+                    cell.append('W')
+                    self.water_cells.add((index_col, index_row))
+
+    def remove_water(self):
+        self.water_cells.clear()
+        for row in self.grid:
+            for cell in row:
+                if 'W' in cell:
+                    cell.remove('W')
+
+    def plant_seed(self, point):
+        cell = self.soil_cell(point)
+        if cell and 'P' not in self.grid[cell[1]][cell[0]]:
+            self.grid[cell[1]][cell[0]].append('P')
+            self.plant_cells.add(cell)
+            return True
+        return False
+
+def setUpModule():
+    # assets are loaded relative to the repository
+    os.chdir(ROOT)
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+class SoilLayerTest(unittest.TestCase):
+    def setUp(self):
+        # the groups the level passes in, so sprites left behind in them show up in the counts
+        self.all_sprites = CameraGroup()
+        self.soil_layer = SoilLayer(self.all_sprites, CollisionGroup(), False)
+        grid = self.soil_layer.grid
+        farmable = grid.find(FARMABLE, FARMABLE)
+        self.legacy = LegacySoil(grid.width, grid.height, farmable)
+
+        # points on and around the farm, a few cells past its edges
+        self.rng = Random(0)
+        cols = [x for x, y in farmable]
+        rows = [y for x, y in farmable]
+        self.area = ((min(cols) - 2) * TILE_SIZE, (max(cols) + 3) * TILE_SIZE, (min(rows) - 2) * TILE_SIZE, (max(rows) + 3) * TILE_SIZE)
+
+    def point(self):
+        left, right, top, bottom = self.area
+        return (self.rng.uniform(left, right), self.rng.uniform(top, bottom))
+
+    def set_raining(self, raining):
+        self.soil_layer.raining = self.legacy.raining = raining
+
+    def assertSameSoil(self):
+        soil_layer, legacy = self.soil_layer, self.legacy
+        for index_row, row in enumerate(legacy.grid):
+            for index_col, cell in enumerate(row):
+                self.assertEqual(set(soil_layer.grid[index_row][index_col]), set(cell), (index_col, index_row))
+        self.assertEqual({cell: tile.image for cell, tile in soil_layer.soil_tiles.items()},
+                         {cell: soil_layer.soil_surfs[key] for cell, key in legacy.soil_tiles.items()})
+        self.assertEqual(len(soil_layer.soil_sprites), len(legacy.soil_tiles))
+        self.assertEqual({(sprite.rect.x // TILE_SIZE, sprite.rect.y // TILE_SIZE) for sprite in soil_layer.water_sprites}, legacy.water_cells)
+        self.assertEqual(len(soil_layer.water_sprites), len(legacy.water_cells))
+        self.assertEqual({(plant.soil.rect.x // TILE_SIZE, plant.soil.rect.y // TILE_SIZE) for plant in soil_layer.plant_sprites}, legacy.plant_cells)
+        self.assertEqual(len(self.all_sprites), len(legacy.soil_tiles) + len(legacy.water_cells) + len(legacy.plant_cells))
+
+    def hoe(self, count):
+        for _ in range(count):
+            point = self.point()
+            self.soil_layer.get_hit(point)
+            self.legacy.get_hit(point)
+
+    def test_hoe(self):
+        self.hoe(400)
+        self.assertSameSoil()
+
+    def test_hoe_in_the_rain(self):
+        self.set_raining(True)
+        self.hoe(400)
+        self.assertSameSoil()
+
+    def test_hoe_same_cells(self):
+        # striking hoed cells again, in the rain too, reshapes tiles without adding sprites
+        points = [self.point() for _ in range(40)]
+        for strike in range(4):
+            self.set_raining(strike % 2 == 1)
+            for point in points:
+                self.soil_layer.get_hit(point)
+                self.legacy.get_hit(point)
+            self.assertSameSoil()
+
+    def test_water(self):
+        self.hoe(300)
+        for _ in range(400):
+            point = self.point()
+            self.soil_layer.water(point)
+            self.legacy.water(point)
+        self.assertSameSoil()
+
+    def test_plant(self):
+        self.hoe(300)
+        for index in range(400):
+            point = self.point()
+            self.assertEqual(self.soil_layer.plant_seed(point, 'corn' if index % 2 else 'tomato'), self.legacy.plant_seed(point))
+        self.assertSameSoil()
+
+    def test_remove_water(self):
+        # a few days of tool use, each ending like Level.reset: dry out, then water everything if it rains
+        for day in range(4):
+            self.set_raining(day % 2 == 1)
+            self.hoe(100)
+            for _ in range(100):
+                point = self.point()
+                self.soil_layer.water(point)
+                self.legacy.water(point)
+            for _ in range(50):
+                point = self.point()
+                self.assertEqual(self.soil_layer.plant_seed(point, 'corn'), self.legacy.plant_seed(point))
+            self.assertSameSoil()
+            self.soil_layer.remove_water()
+            self.legacy.remove_water()
+            self.assertSameSoil()
+            if self.soil_layer.raining:
+                self.soil_layer.water_all()
+                self.legacy.water_all()
+                self.assertSameSoil()
+
+if __name__ == '__main__':
+    unittest.main()